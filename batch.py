@@ -0,0 +1,49 @@
+import argparse
+import json
+from wisselwerking.batch import read_manifest, run_batch
+from wisselwerking.history import history_cache, read_history
+from wisselwerking.settings import history_cache_file, HISTORY_WORKERS
+
+parser = argparse.ArgumentParser(description="Toewijzen van meerdere aanmeldformulieren (faculteiten of rondes)")
+parser.add_argument("manifest",
+                    help="puntkomma-gescheiden bestand met per regel formulier, capaciteiten, uitvoer "
+                         "(map) en optioneel solver en verrassingen")
+parser.add_argument("previous_years_dir", help="locatie van de voorgaande toewijzingen")
+parser.add_argument("--workers", type=int, help="aantal processen (standaard het aantal processoren)")
+parser.add_argument("--history-workers", type=int, default=HISTORY_WORKERS,
+                    help="aantal jaren dat tegelijk wordt ingelezen")
+parser.add_argument("--refresh", action="store_true",
+                    help="lees alle voorgaande jaren opnieuw in plaats van uit de cache")
+parser.add_argument("--summary", help="sla de samenvatting per formulier op als JSON")
+args = parser.parse_args()
+
+jobs = read_manifest(args.manifest)
+history = read_history(args.previous_years_dir,
+                       cache=history_cache(history_cache_file, args.refresh),
+                       workers=args.history_workers)
+summaries = run_batch(jobs, history, args.workers)
+
+failed = 0
+for summary in summaries:
+    print(f"""
+    {summary.job.export} -> {summary.job.output_dir}:
+    """)
+    if summary.log:
+        print(summary.log.rstrip())
+    if summary.error:
+        failed += 1
+        print(f"MISLUKT: {summary.error.rstrip()}")
+        continue
+    for choice, count in summary.counts.items():
+        print(f"{str(count).rjust(3)} {choice}")
+    print(f"{str(sum(summary.counts.values())).rjust(3)} TOTAAL van {summary.enrollments} aanmeldingen")
+    if summary.empty:
+        print("Zonder toewijzingen: " + ", ".join(summary.empty))
+    print(", ".join(f"{count} {rank + 1}e keuze" for rank, count in enumerate(summary.ranks)) +
+          f", {len(summary.unassigned)} zonder toewijzing ({summary.seconds:.2f}s)")
+
+if args.summary:
+    with open(args.summary, mode="w", encoding="utf-8") as json_file:
+        json.dump([summary.to_dict() for summary in summaries], json_file, indent=2, ensure_ascii=False)
+
+print(f"\nKLAAR: {len(summaries) - failed} gelukt, {failed} mislukt")
@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from wisselwerking.assign import assign
+from wisselwerking.cache import HistoryCache
+from wisselwerking.enrollments import read_enrollments
+from wisselwerking.history import history_cache, normalizer, read_history
+from wisselwerking.output import write_assignments, write_organizer_files
+from wisselwerking.settings import history_cache_file, output_file
+from wisselwerking.synthetic import synthetic_capacities, synthetic_choices, write_form_export, write_history_tree
+
+parser = argparse.ArgumentParser(description="Meet de snelheid van inlezen, toewijzen en wegschrijven")
+parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5],
+                    help="aantallen rijen van het aanmeldformulier en van de voorgaande jaren (tot 10^6)")
+parser.add_argument("--choices", type=int, default=40, help="aantal wisselwerkingen")
+parser.add_argument("--years", type=int, default=12, help="aantal voorgaande jaren")
+parser.add_argument("--repeat", type=int, default=3, help="aantal metingen per onderdeel, de snelste telt")
+parser.add_argument("--max-optimal", type=int, default=10 ** 5,
+                    help="grootste aantal rijen waarvoor ook --solver optimal wordt gemeten")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--output", default="benchmark.json", help="bestand voor de resultaten")
+parser.add_argument("--compare", help="eerdere resultaten om mee te vergelijken")
+args = parser.parse_args()
+
+
+def measure(function: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> float:
+    """
+    The fastest of `repeat` runs, `setup` is called before each run and is
+    not measured
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        # the scripts are quite talkative
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_size(size: int, workdir: str) -> List[Dict[str, object]]:
+    rng = random.Random(args.seed)
+    choices = synthetic_choices(args.choices)
+    capacities = synthetic_capacities(choices, size, rng)
+    form_path = os.path.join(workdir, "aanmeldformulier.csv")
+    history_path = os.path.join(workdir, "voorgaande-jaren")
+    write_form_export(form_path, size, choices, rng)
+    write_history_tree(history_path, args.years, max(1, size // args.years), choices, rng)
+
+    results = []
+
+    def add(phase: str, function: Callable[[], object], rows: int, setup: Optional[Callable[[], object]] = None):
+        seconds = measure(function, args.repeat, setup)
+        results.append({'size': size, 'phase': phase, 'rows': rows, 'seconds': round(seconds, 6)})
+        print(f"{size:>9} {phase:<20} {seconds:10.4f}s")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        enrollments, form_fieldnames = read_enrollments(form_path)
+        history = read_history(history_path)
+    history_rows = len(history.items)
+
+    add('read_enrollments', lambda: read_enrollments(form_path), size)
+
+    def read_cold():
+        normalizer.clear()
+        read_history(history_path)
+    add('read_history', read_cold, history_rows)
+
+    cache_path = os.path.join(workdir, history_cache_file)
+    read_history(history_path, cache=history_cache(cache_path))
+    add('read_history_cached', lambda: read_history(history_path, cache=HistoryCache(
+        cache_path, fingerprint=normalizer.renames)), history_rows)
+
+    result = None
+    for solver in ['greedy', 'optimal']:
+        if solver == 'optimal' and size > args.max_optimal:
+            continue
+
+        def run_assign():
+            nonlocal result
+            result = assign(enrollments, capacities, history, solver=solver)
+        add(f'assign_{solver}', run_assign, len(enrollments))
+
+    # the statistics and output are written to the working directory
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        add('history_to_csv', lambda: history.to_csv(), history_rows)
+
+        output_path = output_file
+
+        def new_output_dir():
+            # otherwise the next runs only find unchanged organizer files
+            nonlocal output_path
+            output_path = os.path.join(tempfile.mkdtemp(dir=workdir), output_file)
+
+        def write_output():
+            write_assignments(output_path, result.assignments, form_fieldnames)
+            write_organizer_files(output_path, result.assignments, result.counter)
+        add('write_output', write_output, len(result.assignments), new_output_dir)
+    finally:
+        os.chdir(cwd)
+
+    return results
+
+
+def compare(results: List[Dict[str, object]], path: str):
+    with open(path, mode="r", encoding="utf-8") as json_file:
+        previous = {(item['size'], item['phase']): item['seconds'] for item in json.load(json_file)['results']}
+
+    print(f"""
+    VERGELIJKING MET {path}:
+    """)
+    for item in results:
+        before = previous.get((item['size'], item['phase']))
+        if before:
+            print(f"{item['size']:>9} {item['phase']:<20} {before:10.4f}s -> {item['seconds']:10.4f}s "
+                  f"({item['seconds'] / before:.2f}x)")
+
+
+results: List[Dict[str, object]] = []
+for size in args.sizes:
+    with tempfile.TemporaryDirectory() as workdir:
+        results += benchmark_size(size, workdir)
+
+with open(args.output, mode="w", encoding="utf-8") as json_file:
+    json.dump({
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': args.seed,
+        'choices': args.choices,
+        'years': args.years,
+        'results': results
+    }, json_file, indent=2)
+
+if args.compare:
+    compare(results, args.compare)
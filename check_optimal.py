@@ -0,0 +1,101 @@
+import argparse
+import random
+import sys
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from wisselwerking.assign import NO_ASSIGNMENT_COST, RANK_COSTS, min_cost_flow
+from wisselwerking.settings import ENROLLMENT_CHOICES, NONE_CHOICE
+
+parser = argparse.ArgumentParser(
+    description="Controleer of --solver optimal de laagste totale kosten vindt, "
+                "door kleine willekeurige aanmeldingen met alle mogelijke toewijzingen te vergelijken")
+parser.add_argument("--cases", type=int, default=300, help="aantal willekeurige aanmeldingen")
+parser.add_argument("--enrollments", type=int, default=8, help="grootste aantal deelnemers per aanmelding")
+parser.add_argument("--seed", type=int, default=1)
+args = parser.parse_args()
+
+CHOICES = ['A', 'B', 'C', 'D', 'E']
+
+
+def ranked_choices(enrollment: Mapping[str, str]) -> Dict[str, int]:
+    """
+    The choices of an enrollment with the cost of their (first) rank
+    """
+    costs: Dict[str, int] = {}
+    for rank, key in enumerate(ENROLLMENT_CHOICES):
+        choice = enrollment[key]
+        if choice and choice not in NONE_CHOICE:
+            costs.setdefault(choice.strip(), RANK_COSTS[rank])
+    return costs
+
+
+def random_case(rng: random.Random) -> Tuple[List[Dict[str, str]], List[str], Dict[str, int], Dict[str, int]]:
+    enrollments = [{key: rng.choice(CHOICES + NONE_CHOICE[:2]) for key in ENROLLMENT_CHOICES}
+                   for _ in range(rng.randint(1, args.enrollments))]
+    capacities = {choice: rng.randint(0, 3) for choice in CHOICES}
+    # some places might already be taken
+    counter = {choice: rng.randint(0, capacity) for choice, capacity in capacities.items() if rng.random() < 0.3}
+    # the closed choices are left out, like open_choices() does
+    choices = [choice for choice in CHOICES if capacities[choice] != 0]
+    return enrollments, choices, capacities, counter
+
+
+def lowest_cost(enrollments: List[Dict[str, str]], remaining: Dict[str, int]) -> int:
+    """
+    Tries all the possible assignments
+    """
+    options = [list(ranked_choices(enrollment).items()) for enrollment in enrollments]
+
+    def search(index: int) -> int:
+        if index == len(options):
+            return 0
+        best = NO_ASSIGNMENT_COST + search(index + 1)
+        for choice, cost in options[index]:
+            if remaining.get(choice, 0) > 0:
+                remaining[choice] -= 1
+                best = min(best, cost + search(index + 1))
+                remaining[choice] += 1
+        return best
+
+    return search(0)
+
+
+def check(enrollments: List[Dict[str, str]],
+          choices: List[str],
+          capacities: Dict[str, int],
+          counter: Dict[str, int]) -> Optional[str]:
+    remaining = {choice: capacities[choice] - counter.get(choice, 0) for choice in choices}
+    assignments = min_cost_flow(enrollments, list(choices), lambda choice: capacities[choice], dict(counter))
+
+    cost = NO_ASSIGNMENT_COST * (len(enrollments) - len(assignments))
+    assigned = set()
+    load: Dict[str, int] = {}
+    for enrollment, choice in assignments:
+        if id(enrollment) in assigned:
+            return f"assigned twice: {enrollment}"
+        assigned.add(id(enrollment))
+        ranked = ranked_choices(enrollment)
+        if choice not in ranked:
+            return f"not chosen: {choice} for {enrollment}"
+        cost += ranked[choice]
+        load[choice] = load.get(choice, 0) + 1
+    for choice, count in load.items():
+        if count > remaining.get(choice, 0):
+            return f"over capacity: {choice} ({count} > {remaining.get(choice, 0)})"
+
+    best = lowest_cost(enrollments, remaining)
+    if cost != best:
+        return f"cost {cost}, lowest possible {best}"
+    return None
+
+
+rng = random.Random(args.seed)
+for case in range(args.cases):
+    enrollments, choices, capacities, counter = random_case(rng)
+    error = check(enrollments, choices, capacities, counter)
+    if error is not None:
+        sys.exit(f"Geval {case + 1} (--seed {args.seed}) is niet optimaal: {error}\n"
+                 f"capaciteiten: {capacities}, al toegewezen: {counter}\n"
+                 f"aanmeldingen: {enrollments}")
+
+print(f"Alle {args.cases} gevallen optimaal")
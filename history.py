@@ -1,6 +1,74 @@
-import sys
-from wisselwerking.history import read_history
-previous_years_dir = sys.argv[1]
+import argparse
+from typing import Dict
+from wisselwerking.export import EXPORT_FORMATS, HistoryExport, default_format
+from wisselwerking.history import history_cache, normalizer, read_history, show_timings
+from wisselwerking.profiling import PROFILERS, RunProfile, show_profile
+from wisselwerking.store import HistoryStore
+from wisselwerking.settings import history_cache_file, history_db_file, history_export_dir, history_flows_file, \
+    history_flows_matrix_file, history_never_exchanged_file, history_statistics_file, profile_file, \
+    profile_stats_file, HISTORY_WORKERS
 
-history = read_history(previous_years_dir)
-history.to_csv()
+parser = argparse.ArgumentParser(description="Statistieken van voorgaande wisselwerkingen")
+parser.add_argument("previous_years_dir", help="locatie van de voorgaande toewijzingen")
+parser.add_argument("--refresh", action="store_true",
+                    help="lees alle voorgaande jaren opnieuw in plaats van uit de cache")
+parser.add_argument("--rebuild", action="store_true",
+                    help="bereken alle statistieken opnieuw in plaats van alleen de nieuwe jaren toe te voegen")
+parser.add_argument("--workers", type=int, default=HISTORY_WORKERS,
+                    help="aantal jaren dat tegelijk wordt ingelezen")
+parser.add_argument("--timings", action="store_true",
+                    help="toon de inleestijd per jaar")
+parser.add_argument("--history-db", nargs="?", const=history_db_file,
+                    help=f"importeer de voorgaande jaren in een SQLite-database (standaard {history_db_file})")
+parser.add_argument("--export", nargs="?", const=default_format(), choices=EXPORT_FORMATS,
+                    help=f"exporteer de geanonimiseerde deelnames en totalen per jaar naar {history_export_dir} "
+                         f"(standaard {default_format()})")
+parser.add_argument("--flows", action="store_true",
+                    help=f"tel per jaar de deelnemers van elke afdeling naar elke afdeling ({history_flows_file}, "
+                         f"{history_flows_matrix_file} en {history_never_exchanged_file}, hiervoor is NumPy nodig)")
+parser.add_argument("--profile", action="store_true",
+                    help=f"meet de duur van elk onderdeel, de caches en het geheugen en sla dit op in {profile_file}")
+parser.add_argument("--profiler", choices=PROFILERS,
+                    help=f"profileer ook de hele run (cprofile slaat ook {profile_stats_file} op)")
+args = parser.parse_args()
+
+profile = RunProfile(args.profiler)
+profile.start()
+
+timings: Dict[str, float] = {}
+with profile.phase('read_history') as phase:
+    if args.history_db:
+        cache = HistoryStore(args.history_db, args.refresh)
+        history = cache.import_history(args.previous_years_dir, args.workers, timings)
+    else:
+        cache = history_cache(history_cache_file, args.refresh)
+        history = read_history(args.previous_years_dir,
+                               cache=cache,
+                               workers=args.workers,
+                               timings=timings)
+    phase.rows = len(history)
+if args.timings:
+    show_timings(timings)
+
+with profile.phase('to_csv') as phase:
+    history.to_csv(history_statistics_file,
+                   args.rebuild,
+                   HistoryExport(history_export_dir, args.export) if args.export else None)
+    phase.rows = len(history)
+
+if args.flows:
+    # only needed here
+    from wisselwerking.flows import DepartmentFlows, write_never_exchanged
+
+    with profile.phase('flows') as phase:
+        flows = DepartmentFlows.from_history(history)
+        flows.write_csv(history_flows_file)
+        flows.save(history_flows_matrix_file)
+        write_never_exchanged(history_never_exchanged_file, flows.never_exchanged())
+        phase.rows = len(history)
+
+if args.profile or args.profiler:
+    profile.cache('history', cache.hits, cache.misses)
+    profile.cache('renames', normalizer.hits, normalizer.misses)
+    show_profile(profile.write(profile_file, profile_stats_file))
+    print(f"\nProfiel opgeslagen in {profile_file}\n")
@@ -1,215 +1,122 @@
 #!/usr/bin/env python3
-import csv
+import argparse
 import sys
-import re
-import os
-import glob
-from typing import Dict, List, Tuple
-
-from wisselwerking.history import Enrollment, EnrollmentCollection, read_history, rename_dept
+import time
+from typing import Dict, Hashable, List, Mapping, Optional, Tuple
+
+from wisselwerking.assign import SOLVERS, AssignmentResult, MissingCapacities, assign
+from wisselwerking.capacities import read_capacities, save_capacities
+from wisselwerking.duplicates import FORM_SOURCE, DuplicatePair, Participant, find_duplicates
+from wisselwerking.enrollments import read_enrollments
+from wisselwerking.history import EnrollmentCollection, history_cache, normalizer, read_history, rename_dept, show_timings
+from wisselwerking.output import write_assignments, write_organizer_files
+from wisselwerking.profiling import PROFILERS, RunProfile, show_profile
+from wisselwerking.store import HistoryStore
+from wisselwerking.surprise import auto_policy, placement_policy, read_placements, surprise_choice
+from wisselwerking.watch import ExportWatcher, IncrementalAssigner
 from wisselwerking.settings import \
     capacity_file, \
     output_file, \
-    ASSIGNED_CHOICE, \
-    CAPACITY_CHOICE, \
-    CAPACITY_VALUE, \
-    TEAM, \
-    ENROLLMENT_SOURCE, \
-    ENROLLMENT_FIRSTNAME, \
-    ENROLLMENT_LASTNAME, \
+    history_cache_file, \
+    history_db_file, \
+    profile_file, \
+    profile_stats_file, \
     ENROLLMENT_MAIL, \
     ENROLLMENT_DEPT, \
-    ENROLLMENT_CHOICES, \
+    HISTORY_WORKERS, \
     RANDOM_CHOICE, \
-    NONE_CHOICE, \
-    NO_ASSIGNMENT
-
-filename = sys.argv[1]
-previous_years_dir = sys.argv[2]
-
-
-#
-# Start assigning!
-#
-
-enrollments: List[Dict[str, str]] = []
-capacities = {}
-counter = {}
-
-assignments: List[Tuple[Dict[str, str], str]] = []
-
-
-def format_name(enrollment, include_lastname=False):
-    first_name = str.join(' ',
-                          (part.capitalize() for part in enrollment[ENROLLMENT_FIRSTNAME].strip().split(' ')))
-    if include_lastname:
-        parts = []
-        for part in enrollment[ENROLLMENT_LASTNAME].strip().split(' '):
-            if part.lower() in ['van', 'von', 'de', 'der', 'den', 'die']:
-                parts.append(part.lower())
-            else:
-                parts.append(part.capitalize())
-        return first_name + ' ' + str.join(' ', parts)
-
-    return first_name
-
-
-def mail_template(assigned, enrollment):
-    name = format_name(enrollment)
-    first_choice = enrollment[ENROLLMENT_CHOICES[0]].strip()
-    second_choice = enrollment[ENROLLMENT_CHOICES[1]].strip()
-    third_choice = enrollment[ENROLLMENT_CHOICES[2]].strip()
-    if assigned == first_choice or first_choice == RANDOM_CHOICE:
-        # first choice
-        content = f"""Je bent geplaatst voor de Wisselwerking {assigned}. We hebben je gegevens doorgegeven aan de contactpersoon van deze Wisselwerking. Deze zal contact met opnemen om verdere afspraken te maken over je deelname.
-
-Heel veel plezier bij je wisselwerking!"""
-    elif assigned == second_choice or assigned == third_choice or \
-            RANDOM_CHOICE in [second_choice, third_choice]:
-        # second, third choice
-        if assigned == third_choice:
-            ordinal = "derde"
-        elif assigned == second_choice:
-            ordinal = "tweede"
-        else:
-            # random!
-            ordinal = "vrije"
-
-        content = f"""Helaas was bij jouw eerste keuze voor de Wisselwerking bij {first_choice} geen plek meer. Je bent nu geplaatst bij je {ordinal} keuze: {assigned}.
-
-We hebben je gegevens doorgegeven aan de contactpersoon van deze Wisselwerking. Deze zal contact met opnemen om verdere afspraken te maken over je deelname.
-
-Heel veel plezier bij je wisselwerking!"""
-    else:
-        # nothing
-        content = f"Je hebt je aangemeld voor de Wisselwerking {first_choice}. Helaas waren deze en eventuele verdere keuzes vol."
-
-    return f"""
-Beste {name},
-
-{content}
-
-Hartelijke groet,
-
-Team Wisselwerking Geesteswetenschappen
-{TEAM}
-""".strip()
-
-
-def get_capacity(choice) -> int:
-    if choice == RANDOM_CHOICE:
-        return 999
-    try:
-        capacity = capacities[choice]
-        if capacity is None:
-            raise KeyError
-        return capacity
-    except KeyError:
-        while True:
-            value = input(f"Capacity for {choice}? ")
-            try:
-                parsed = int(value)
-                capacities[choice] = parsed
-                return parsed
-            except ValueError:
-                print("NOPE")
-                pass
-
-
-def save_capacities():
-    with open(capacity_file, mode="w", encoding="utf-8-sig") as csv_file:
-        fieldnames = [CAPACITY_CHOICE, CAPACITY_VALUE]
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=';')
-
-        writer.writeheader()
-        for (choice, value) in capacities.items():
-            writer.writerow({
-                CAPACITY_CHOICE: choice,
-                CAPACITY_VALUE: value
-            })
-
-
-if os.path.exists(capacity_file):
-    with open(capacity_file, mode="r", encoding="utf-8-sig") as csv_file:
-        csv_reader = csv.DictReader(csv_file, delimiter=';')
-
-        for row in csv_reader:
-            try:
-                capacity = int(row[CAPACITY_VALUE])
-            except ValueError:
-                capacity = None
-            except TypeError:
-                capacity = None
-            capacities[row[CAPACITY_CHOICE]] = capacity
-
-unique_emails = set()
-
-with open(filename, mode="r", encoding='iso8859-15') as csv_file:
-    csv_reader = csv.DictReader(csv_file, delimiter=';')
-    form_fieldnames = csv_reader.fieldnames
-    line_count = 0
-
-    for row in csv_reader:
-        if row[ENROLLMENT_SOURCE] != "Test":
-            mail = row[ENROLLMENT_MAIL].lower().strip()
-            if mail in unique_emails:
-                print("DUBBELE DEELNEMER: " + mail)
-            else:
-                # The top row is the last entry
-                enrollments.insert(0, row)
-                line_count += 1
-                unique_emails.add(mail)
-
-history = read_history(previous_years_dir)
-
-# Make sure all possible choices are known
-for enrollment in enrollments:
-    for choice in map(lambda key: enrollment[key], ENROLLMENT_CHOICES):
-        if not choice or choice.strip() in NONE_CHOICE:
-            continue
-        else:
-            counter[choice.strip()] = 0
-
-
-def assign_choice(enrollment: Dict[str, str], choice: str):
-    try:
-        counter[choice] += 1
-    except KeyError:
-        counter[choice] = 1
-    assignments.append((enrollment, choice))
-    unassigned.remove(enrollment)
-
-    if choice in choices and counter[choice] >= get_capacity(choice):
-        choices.remove(choice)
+    WATCH_DEBOUNCE, \
+    WATCH_INTERVAL
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Toewijzen wisselwerkingen")
+    parser.add_argument("filename", help="resultaten van het aanmeldformulier (of met --watch een map met exports)")
+    parser.add_argument("previous_years_dir", help="locatie van de voorgaande toewijzingen")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="greedy",
+                        help="greedy: om de beurt per keuze; optimal: zoveel mogelijk eerste en tweede keuzes")
+    parser.add_argument("--refresh", action="store_true",
+                        help="lees alle voorgaande jaren opnieuw in plaats van uit de cache")
+    parser.add_argument("--workers", type=int, default=HISTORY_WORKERS,
+                        help="aantal jaren dat tegelijk wordt ingelezen")
+    parser.add_argument("--timings", action="store_true",
+                        help="toon de inleestijd per jaar")
+    parser.add_argument("--history-db", nargs="?", const=history_db_file,
+                        help=f"importeer de voorgaande jaren in een SQLite-database (standaard {history_db_file})")
+    parser.add_argument("--capacities", default=capacity_file,
+                        help="bestand met de capaciteit per wisselwerking")
+    parser.add_argument("--batch", action="store_true",
+                        help="stel geen vragen: alle capaciteiten moeten bekend zijn")
+    parser.add_argument("--surprises",
+                        help="bestand met de toewijzingen voor wie verrast wil worden (e-mail en toegewezen)")
+    parser.add_argument("--auto-surprise", action="store_true",
+                        help="kies zelf een onbekende wisselwerking met de meeste vrije plekken voor wie verrast wil worden")
+    parser.add_argument("--watch", action="store_true",
+                        help="blijf het aanmeldformulier volgen en werk de toewijzingen bij (zonder vragen, zoals --batch)")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                        help="aantal seconden tussen het controleren van het aanmeldformulier")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                        help="aantal seconden zonder nieuwe aanmeldingen voordat de toewijzingen worden weggeschreven")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"meet de duur van elk onderdeel, de caches en het geheugen en sla dit op in {profile_file}")
+    parser.add_argument("--profiler", choices=PROFILERS,
+                        help=f"profileer ook de hele run (cprofile slaat ook {profile_stats_file} op)")
+    return parser.parse_args(argv)
+
+
+def ask_capacity(choice: str) -> int:
+    while True:
+        value = input(f"Capacity for {choice}? ")
+        try:
+            return int(value)
+        except ValueError:
+            print("NOPE")
+            pass
 
 
-def show_historic_counts():
+def show_historic_counts(history: EnrollmentCollection):
     print("""
     TOEWIJZINGEN VAN VORIGE WISSELWERKINGEN:
     """)
-    historic_counts = {}
-    for item in history.list_assigned():
-        try:
-            historic_counts[item] += 1
-        except KeyError:
-            historic_counts[item] = 1
-
+    historic_counts = history.count_assigned()
     for item in sorted(historic_counts):
         print(f"{str(historic_counts[item]).rjust(3)} {item}")
 
 
-def show_counts(show_unassigned=True):
+def show_duplicates(pairs: List[DuplicatePair], skipped: List[Tuple[Hashable, int]], history: EnrollmentCollection):
+    def describe(participant: Participant) -> str:
+        if participant.source == FORM_SOURCE:
+            return f"{participant.name or '?'} <{participant.email}>"
+        years = sorted(set(f"{x.years[0]}-{x.years[1]}" for x in history.by_email(participant.email)))
+        return f"<{participant.email}> ({participant.source}: {', '.join(years)})"
+
+    if pairs:
+        print("""
+    MOGELIJK DUBBELE DEELNEMERS:
+    """)
+        for pair in pairs:
+            print(f"{pair.score:.2f} {pair.reason}: {describe(pair.first)}\n     {describe(pair.second)}")
+
+    if skipped:
+        print("""
+    NIET OP DUBBELE DEELNEMERS GECONTROLEERD (TE VEEL DEELNEMERS MET DEZELFDE GEGEVENS):
+    """)
+        for key, size in skipped:
+            print(f"{str(size).rjust(4)} {' '.join(map(str, key))}")
+
+
+def show_counts(result: AssignmentResult, show_unassigned=True):
     print("""
     AANTAL AANMELDINGEN:
     """)
 
-    choices = sorted(set(capacities.keys()).union(counter.keys()))
+    choices = sorted(set(result.capacities.keys()).union(result.counter.keys()))
     maxlength = sorted(len(choice) for choice in choices)[-1]
     sum = 0
     empty = []
 
     for choice in choices:
-        count = counter.get(choice, 0)
+        count = result.counter.get(choice, 0)
         if count == 0:
             if choice != RANDOM_CHOICE:
                 empty.append(choice)
@@ -227,62 +134,45 @@ def show_counts(show_unassigned=True):
         for choice in empty:
             print(choice)
 
-    if show_unassigned and unassigned:
+    if show_unassigned and result.unassigned:
         print(f"""
-    {len(unassigned)} WISSELWERKERS ZONDER TOEWIJZINGEN:
+    {len(result.unassigned)} WISSELWERKERS ZONDER TOEWIJZINGEN:
     """)
-        for enrollment in unassigned:
+        for enrollment in result.unassigned:
             print(enrollment[ENROLLMENT_MAIL])
 
 
-choices = list(sorted(set(capacities.keys()).union(counter.keys())))
-for item, capacity in capacities.items():
-    # possible to close a department
-    if capacity == 0:
-        choices.remove(item)
-unassigned = list(enrollments)
-
-priority = []
-# Walk through the choices in iterations
-# Give priority on order of choice and within that on order of enrollment
-for key in ENROLLMENT_CHOICES:
-    for enrollment in enrollments:
-        choice = enrollment[key]
-        if choice and choice not in NONE_CHOICE:
-            priority.append((enrollment, choice.strip()))
-
-try:
-    while unassigned and choices:
-        done = True
-        for choice in list(choices):
-            for enrollment, enrollment_choice in priority:
-                if enrollment in unassigned and enrollment_choice == choice:
-                    assign_choice(enrollment, choice)
-                    done = False
-                    break
-        if done:
-            break
-except KeyboardInterrupt:
-    # still store the updated capacities
-    save_capacities()
-    raise
-
-# assign the random members
-choices.remove(RANDOM_CHOICE)
-
-
-def reassign_random(assignments: List[Tuple[Dict[str, str], str]], history: EnrollmentCollection):
+def show_ranks(result: AssignmentResult):
+    print("""
+    TOEGEWEZEN KEUZES:
+    """)
+    for rank, count in enumerate(result.ranks()):
+        print(f"{str(count).rjust(3)} {rank + 1}e keuze")
+    print(f"{str(len(result.unassigned)).rjust(3)} zonder toewijzing")
+
+
+def surprise_prompt(args: argparse.Namespace,
+                    history: EnrollmentCollection,
+                    placements: Dict[str, str],
+                    capacities: Dict[str, Optional[int]]):
+    """
+    Places those who want to be surprised: shows what they did before and
+    uses their placement, the automatic choice or asks for a choice.
+    """
+    # in batch mode the remaining surprises are always placed automatically
+    auto_surprise = args.auto_surprise or args.batch
     first = True
-    for enrollment in list(enrollment for (enrollment, choice) in assignments if choice == RANDOM_CHOICE):
-        unassigned.append(enrollment)
+
+    def surprise(enrollment: Mapping[str, str], result: AssignmentResult) -> Optional[str]:
+        nonlocal first
         email = enrollment[ENROLLMENT_MAIL]
         if first:
             print("\n\n===TUSSENSTAND===\n\n")
-            show_historic_counts()
-            show_counts(False)
+            show_historic_counts(history)
+            show_counts(result, False)
             first = False
         previous = list(history.by_email(email))
-        depts = set([rename_dept(row[ENROLLMENT_DEPT])] + list(map(lambda x: x.from_dept, previous)))
+        depts = set([rename_dept(enrollment[ENROLLMENT_DEPT])] + list(map(lambda x: x.from_dept, previous)))
         print(f"\n\n{email} ({'; '.join(depts)}) moet verrast worden")
         if previous:
             print("Deed eerder de volgende wisselwerkingen: " +
@@ -290,99 +180,173 @@ def reassign_random(assignments: List[Tuple[Dict[str, str], str]], history: Enro
         else:
             print("Wisselwerking-newbie!")
 
-        while True:
+        choice = placements.get(email.lower().strip())
+        if choice is not None:
+            print(f"Volgens {args.surprises}: {choice}")
+            if not result.has_room(choice):
+                print("Zit al vol!")
+                choice = None
+        if choice is None and auto_surprise:
+            choice = surprise_choice(enrollment, history, result.free_places())
+            print(f"Automatisch gekozen: {choice or 'geen vrije plek gevonden'}")
+            return choice
+        while choice is None:
             choice = input("Wijs een andere wisselwerking toe: ")
-            if (0 if choice not in counter else counter[choice]) < get_capacity(choice):
-                for item in assignments:
-                    check_enrolment, _ = item
-                    if check_enrolment == enrollment:
-                        assignments.remove(item)
-                        break
-                assign_choice(enrollment, choice)
-                counter[RANDOM_CHOICE] -= 1
-                break
-            else:
+            if result.get_capacity(choice) is None:
+                capacities[choice] = ask_capacity(choice)
+                result.set_capacity(choice, capacities[choice])
+            if not result.has_room(choice):
                 print("Zit al vol!")
-
-
-reassign_random(assignments, history)
-
-save_capacities()
-
-show_counts()
-
-# Store the assignments
-with open(output_file, mode="w", encoding="utf-8-sig") as csv_file:
-    fieldnames = [ASSIGNED_CHOICE, ENROLLMENT_MAIL, MAIL_COLUMN] + \
-        [field for field in form_fieldnames if field != MAIL_COLUMN]
-    writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=';')
-
-    writer.writeheader()
-    for (row, assigned) in assignments:
-        writer.writerow({
-            ASSIGNED_CHOICE: assigned,
-            "mail": mail_template(assigned, row),
-            **row
-        })
-
-# Store the assignments per choice - to mail the organizers
-output_prepath = str.join('.', output_file.split('.')[:-1])
-
-
-def output_text_file(choice: str, escape=True):
-    return output_prepath + '.' + (choice if not escape else re.sub(r'[\*\(\) \-\.\&\/]+', '-', choice)) + '.txt'
-
-
-existing_files = glob.glob(output_text_file('*', False))
-
-for choice in sorted(counter):
-    if choice == RANDOM_CHOICE:
-        continue
-    count = counter[choice]
-    target = output_text_file(choice)
+                choice = None
+
+        return choice
+
+    return surprise
+
+
+def watch_updates(args: argparse.Namespace,
+                  history: EnrollmentCollection,
+                  placements: Dict[str, str]):
+    """
+    Follows the form export and updates the assignments and organizer
+    files after new enrollments stopped arriving for a while.
+    """
+    watcher = ExportWatcher(args.filename)
+    assigner = IncrementalAssigner(args.solver)
+    surprise = placement_policy(placements, auto_policy(history))
+    # there are enrollments which haven't been written yet
+    pending = False
+    last_change = 0.0
+    missing: List[str] = []
+
+    def update() -> bool:
+        nonlocal missing
+        try:
+            result, recomputed = assigner.update(read_capacities(args.capacities), surprise)
+        except MissingCapacities as error:
+            if error.choices != missing:
+                print(f"CAPACITEIT ONBEKEND, voeg toe aan {args.capacities}: " + ", ".join(error.choices))
+                missing = error.choices
+            return False
+        missing = []
+
+        write_assignments(output_file, result.assignments, watcher.fieldnames)
+        written, unchanged, removed = write_organizer_files(output_file, result.assignments, result.counter)
+        print(f"{time.strftime('%H:%M:%S')} {len(result.assignments)} toegewezen, "
+              f"{len(result.unassigned)} zonder toewijzing, {len(recomputed)} wisselwerkingen herberekend; "
+              f"brieven: {written} geschreven, {unchanged} ongewijzigd, {removed} verwijderd")
+        return True
+
+    print(f"Volg {args.filename} (stop met Ctrl+C)")
     try:
-        existing_files.remove(target)
-    except ValueError:
-        pass
-    with open(target, mode="w", encoding="utf-8-sig") as txt_file:
-        choice_assignments = []
-        for (row, assigned) in assignments:
-            if assigned == choice:
-                choice_assignments.append(
-                    f"{format_name(row, True)} <{row[ENROLLMENT_MAIL]}> ({rename_dept(row[ENROLLMENT_DEPT])})\n")
-
-        if count > 0:
-            txt_file.writelines([f"""Beste organisator,
-
-Leuk dat je je hebt opgegeven om een wisselwerking te organiseren! Voor de wisselwerking {choice} hebben de volgende {count} person(en) zich aangemeld:
-
-"""] +
-                                choice_assignments +
-                                [f"""
-Zou je zo snel mogelijk contact willen opnemen met deze mensen om afspraken te maken over de wisselwerking? 
+        while True:
+            added = assigner.add(watcher.poll())
+            if added:
+                print(f"{time.strftime('%H:%M:%S')} {len(added)} nieuwe aanmelding(en)")
+                last_change = time.monotonic()
+                pending = True
+            if pending and time.monotonic() - last_change >= args.debounce:
+                if update():
+                    pending = False
+                else:
+                    # try again after the next quiet period
+                    last_change = time.monotonic()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        if pending:
+            update()
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    profile = RunProfile(args.profiler)
+    profile.start()
+
+    with profile.phase('read_capacities') as phase:
+        placements = read_placements(args.surprises) if args.surprises else {}
+        capacities = read_capacities(args.capacities)
+        phase.rows = len(capacities) + len(placements)
+
+    if not args.watch:
+        with profile.phase('read_enrollments') as phase:
+            enrollments, form_fieldnames = read_enrollments(args.filename)
+            phase.rows = len(enrollments)
+
+    timings: Dict[str, float] = {}
+    with profile.phase('read_history') as phase:
+        if args.history_db:
+            cache = HistoryStore(args.history_db, args.refresh)
+            history = cache.import_history(args.previous_years_dir, args.workers, timings)
+        else:
+            cache = history_cache(history_cache_file, args.refresh)
+            history = read_history(args.previous_years_dir,
+                                   cache=cache,
+                                   workers=args.workers,
+                                   timings=timings)
+        phase.rows = len(history)
+    if args.timings:
+        show_timings(timings)
+
+    if args.watch:
+        watch_updates(args, history, placements)
+        return
+
+    with profile.phase('find_duplicates') as phase:
+        skipped: List[Tuple[Hashable, int]] = []
+        pairs = find_duplicates(enrollments, history, skipped=skipped)
+        phase.rows = len(enrollments)
+    show_duplicates(pairs, skipped, history)
+
+    def ask_and_remember(choice: str) -> int:
+        capacities[choice] = ask_capacity(choice)
+        return capacities[choice]
 
-Heel veel plezier bij de wisselwerking!
+    try:
+        # interactive questions are included, use --batch for comparable timings
+        with profile.phase('assign') as phase:
+            result = assign(enrollments,
+                            capacities,
+                            history,
+                            solver=args.solver,
+                            ask_capacity=None if args.batch else ask_and_remember,
+                            surprise=surprise_prompt(args, history, placements, capacities))
+            phase.rows = len(enrollments)
+    except MissingCapacities as error:
+        print("""
+    CAPACITEIT ONBEKEND:
+    """)
+        for choice in error.choices:
+            print(choice)
+        sys.exit(f"Voeg de capaciteiten toe aan {args.capacities}")
+    except KeyboardInterrupt:
+        # still store the updated capacities
+        save_capacities(args.capacities, capacities)
+        raise
 
-Hartelijke groet,
+    save_capacities(args.capacities, result.capacities)
 
-Team Wisselwerking Geesteswetenschappen
-{TEAM}
-"""])
-        else:
-            txt_file.writelines([f"""Beste organisator,
+    show_counts(result)
+    show_ranks(result)
 
-Helaas heeft dit jaar niemand zich aangemeld voor de Wisselwerking {choice}.
+    # Store the assignments
+    with profile.phase('write_assignments') as phase:
+        write_assignments(output_file, result.assignments, form_fieldnames)
+        phase.rows = len(result.assignments)
 
-Dank dat je een Wisselwerking wilde organiseren. We hopen dat je volgend jaar weer meedoet!
+    # Store the assignments per choice - to mail the organizers
+    with profile.phase('write_organizer_files') as phase:
+        written, unchanged, removed = write_organizer_files(output_file, result.assignments, result.counter)
+        phase.rows = written + unchanged + removed
+    print(f"\nBRIEVEN AAN ORGANISATOREN: {written} geschreven, {unchanged} ongewijzigd, {removed} verwijderd\n")
 
-Hartelijke groet,
+    if args.profile or args.profiler:
+        profile.cache('history', cache.hits, cache.misses)
+        profile.cache('renames', normalizer.hits, normalizer.misses)
+        show_profile(profile.write(profile_file, profile_stats_file))
+        print(f"\nProfiel opgeslagen in {profile_file}\n")
 
-Team Wisselwerking Geesteswetenschappen
-{TEAM}
-"""])
+    print("DONE! Plaats toewijzingen.csv op de O-schijf")
 
-# Clear existing files, which are no longer assigned
-for existing_file in existing_files:
-    os.remove(existing_file)
 
-print("DONE! Plaats toewijzingen.csv op de O-schijf")
+if __name__ == "__main__":
+    main()
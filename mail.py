@@ -0,0 +1,63 @@
+import argparse
+import os
+from typing import Optional
+
+from wisselwerking.mailer import Mail, MailCheckpoint, SmtpSettings, organizer_mails, participant_mails, \
+    read_assignments, read_organizers, send_mails
+from wisselwerking.settings import mail_checkpoint_file, organizers_file, output_file, MAIL_WORKERS
+
+parser = argparse.ArgumentParser(description="Verstuur de mails aan de deelnemers en organisatoren")
+parser.add_argument("sender", help="afzender van de mails")
+parser.add_argument("--assignments", default=output_file,
+                    help="bestand met de toewijzingen")
+parser.add_argument("--organizers", default=organizers_file,
+                    help="bestand met het e-mailadres van de organisator(en) per wisselwerking")
+parser.add_argument("--checkpoint", default=mail_checkpoint_file,
+                    help="bestand met de al verzonden mails, deze worden niet opnieuw verstuurd")
+parser.add_argument("--host", default="localhost", help="SMTP-server")
+parser.add_argument("--port", type=int, default=25)
+parser.add_argument("--starttls", action="store_true")
+parser.add_argument("--user", help="gebruikersnaam, het wachtwoord staat in $WISSELWERKING_SMTP_PASSWORD")
+parser.add_argument("--workers", type=int, default=MAIL_WORKERS,
+                    help="aantal verbindingen met de SMTP-server")
+parser.add_argument("--rate", type=float,
+                    help="maximaal aantal mails per seconde")
+parser.add_argument("--dry-run", action="store_true",
+                    help="toon alleen hoeveel mails verstuurd zouden worden")
+args = parser.parse_args()
+
+assignments = read_assignments(args.assignments)
+mails = participant_mails(assignments)
+letters, unknown = organizer_mails(assignments, read_organizers(args.organizers))
+mails += letters
+
+if unknown:
+    print(f"""
+    ORGANISATOR ONBEKEND (voeg toe aan {args.organizers}):
+    """)
+    for choice in unknown:
+        print(choice)
+
+checkpoint = MailCheckpoint(args.checkpoint)
+pending = sum(1 for mail in mails if mail not in checkpoint)
+print(f"\n{len(mails)} mails, waarvan {len(mails) - pending} al verzonden\n")
+
+if not args.dry_run and pending:
+    def progress(mail: Mail, error: Optional[Exception]):
+        if error:
+            print(f"MISLUKT: {', '.join(mail.recipients)} ({error})")
+        else:
+            print(f"Verzonden: {', '.join(mail.recipients)}")
+
+    sent, skipped, failed = send_mails(mails,
+                                       SmtpSettings(args.host,
+                                                    args.port,
+                                                    args.sender,
+                                                    args.starttls,
+                                                    args.user,
+                                                    os.environ.get('WISSELWERKING_SMTP_PASSWORD')),
+                                       checkpoint,
+                                       workers=args.workers,
+                                       per_second=args.rate,
+                                       progress=progress)
+    print(f"\nVERZONDEN: {sent} verzonden, {skipped} al eerder verzonden, {failed} mislukt")
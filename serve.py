@@ -0,0 +1,29 @@
+import argparse
+from wisselwerking.service import HistoryService, serve
+from wisselwerking.settings import capacity_file, HISTORY_WORKERS, SERVICE_CHECK_INTERVAL, SERVICE_PORT
+
+parser = argparse.ArgumentParser(description="Lokale service die de voorgaande jaren in het geheugen houdt")
+parser.add_argument("previous_years_dir", help="locatie van de voorgaande toewijzingen")
+parser.add_argument("--host", default="127.0.0.1",
+                    help="adres waarop de service luistert (standaard alleen deze computer)")
+parser.add_argument("--port", type=int, default=SERVICE_PORT)
+parser.add_argument("--capacities", default=capacity_file,
+                    help="bestand met de capaciteit per wisselwerking")
+parser.add_argument("--workers", type=int, default=HISTORY_WORKERS,
+                    help="aantal jaren dat tegelijk wordt ingelezen")
+parser.add_argument("--check-interval", type=float, default=SERVICE_CHECK_INTERVAL,
+                    help="aantal seconden tussen het controleren van de voorgaande jaren op wijzigingen")
+args = parser.parse_args()
+
+service = HistoryService(args.previous_years_dir, args.workers, args.check_interval)
+history = service.get()
+print(f"{len(history)} toewijzingen van voorgaande jaren ingelezen")
+
+server = serve(service, args.host, args.port, args.capacities)
+print(f"Luistert op http://{args.host}:{args.port}/ (stop met Ctrl+C)")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
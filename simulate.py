@@ -0,0 +1,41 @@
+import argparse
+from wisselwerking.capacities import read_capacities
+from wisselwerking.enrollments import read_enrollments
+from wisselwerking.simulation import PLACEMENTS, simulate, summarize, write_summary
+from wisselwerking.settings import capacity_file, simulation_file
+
+parser = argparse.ArgumentParser(description="Simuleer toewijzingen met andere capaciteiten of volgordes")
+parser.add_argument("filename", help="resultaten van het aanmeldformulier")
+parser.add_argument("--capacities", default=capacity_file,
+                    help="bestand met de capaciteit per wisselwerking")
+parser.add_argument("--scenarios", type=int, default=1000,
+                    help="aantal gesimuleerde toewijzingen")
+parser.add_argument("--spread", type=int, default=0,
+                    help="verander elke capaciteit willekeurig met maximaal zoveel plekken")
+parser.add_argument("--shuffle", action="store_true",
+                    help="schud de volgorde van aanmelding")
+parser.add_argument("--seed", type=int, help="startwaarde voor herhaalbare simulaties")
+parser.add_argument("--workers", type=int, help="aantal processen")
+parser.add_argument("--output", default=simulation_file,
+                    help="bestand voor de verdeling per wisselwerking")
+args = parser.parse_args()
+
+enrollments, _ = read_enrollments(args.filename)
+choices, counts = simulate(enrollments,
+                           read_capacities(args.capacities),
+                           scenarios=args.scenarios,
+                           spread=args.spread,
+                           shuffle=args.shuffle,
+                           seed=args.seed,
+                           workers=args.workers)
+
+print(f"""
+    GEMIDDELDE PLAATSINGEN OVER {args.scenarios} SIMULATIES:
+    """)
+totals = counts.sum(axis=1)
+for p, placement in enumerate(PLACEMENTS):
+    values = totals[:, p]
+    print(f"{values.mean():7.1f} {placement} (min {values.min()}, max {values.max()})")
+
+write_summary(args.output, summarize(choices, counts))
+print(f"\nVerdeling per wisselwerking opgeslagen in {args.output}")
@@ -0,0 +1,492 @@
+import heapq
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from .capacities import missing_capacities
+from .history import EnrollmentCollection
+from .settings import ENROLLMENT_CHOICES, NONE_CHOICE, RANDOM_CHOICE
+from .surprise import auto_policy
+
+
+def priority_queues(enrollments: List[Dict[str, str]]) -> Dict[str, List[int]]:
+    # Per choice the enrollments (as index) which want it, giving priority
+    # on order of choice and within that on order of enrollment
+    queues: Dict[str, List[int]] = {}
+    for key in ENROLLMENT_CHOICES:
+        for index, enrollment in enumerate(enrollments):
+            choice = enrollment[key]
+            if choice and choice not in NONE_CHOICE:
+                try:
+                    queues[choice.strip()].append(index)
+                except KeyError:
+                    queues[choice.strip()] = [index]
+    return queues
+
+
+def round_robin(enrollments: List[Dict[str, str]],
+                choices: List[str],
+                get_capacity: Callable[[str], int],
+                counter: Dict[str, int]) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Walk through the choices in iterations: each iteration every open choice
+    gets the next unassigned enrollment from its queue.
+
+    Full choices are removed from `choices` and `counter` is updated with
+    the number of assignments per choice.
+    """
+    queues = priority_queues(enrollments)
+    cursors = dict.fromkeys(queues, 0)
+    assigned: Set[int] = set()
+    assignments: List[Tuple[Dict[str, str], str]] = []
+
+    # choices without any (remaining) enrollments can be skipped
+    active = [choice for choice in choices if choice in queues]
+    while active and len(assigned) < len(enrollments):
+        exhausted = set()
+        for choice in active:
+            queue = queues[choice]
+            cursor = cursors[choice]
+            while cursor < len(queue) and queue[cursor] in assigned:
+                cursor += 1
+
+            if cursor == len(queue):
+                cursors[choice] = cursor
+                exhausted.add(choice)
+                continue
+
+            index = queue[cursor]
+            cursors[choice] = cursor + 1
+            assigned.add(index)
+            assignments.append((enrollments[index], choice))
+            try:
+                counter[choice] += 1
+            except KeyError:
+                counter[choice] = 1
+
+            if counter[choice] >= get_capacity(choice):
+                choices.remove(choice)
+                exhausted.add(choice)
+
+        if exhausted:
+            active = [choice for choice in active if choice not in exhausted]
+
+    return assignments
+
+
+# costs of being assigned to the first, second and third choice
+RANK_COSTS = [0, 2, 3]
+# cost of staying without assignment
+NO_ASSIGNMENT_COST = 4
+
+INFINITY = float('inf')
+
+
+def min_cost_flow(enrollments: List[Dict[str, str]],
+                  choices: List[str],
+                  get_capacity: Callable[[str], int],
+                  counter: Dict[str, int]) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Assign the enrollments with the lowest total cost of the assigned ranks:
+    this maximizes the number of first and second choices.
+
+    The enrollments, choices and capacities form a (sparse) flow network:
+    every enrollment has an edge to each of its choices and to a virtual
+    "unassigned" choice. This is solved using successive shortest paths;
+    each phase augments all the shortest paths at once. Because the costs
+    are small integers, only a few phases are needed.
+
+    Full choices are removed from `choices` and `counter` is updated with
+    the number of assignments per choice.
+    """
+    index = {choice: j for j, choice in enumerate(choices)}
+    capacity = [max(0, get_capacity(choice) - counter.get(choice, 0)) for choice in choices]
+    network = _FlowNetwork(enrollments, index, capacity)
+    network.solve()
+
+    assignments: List[Tuple[Dict[str, str], str]] = []
+    for e, j in enumerate(network.assigned):
+        if j == network.unassigned_node:
+            continue
+        choice = choices[j]
+        assignments.append((enrollments[e], choice))
+        try:
+            counter[choice] += 1
+        except KeyError:
+            counter[choice] = 1
+
+    for j, choice in enumerate(list(choices)):
+        if network.load[j] >= capacity[j]:
+            choices.remove(choice)
+
+    return assignments
+
+
+class _FlowNetwork:
+    def __init__(self, enrollments: List[Dict[str, str]], index: Dict[str, int], capacity: List[int]):
+        self.n = len(enrollments)
+        self.unassigned_node = len(capacity)
+        self.capacity = capacity + [self.n]
+        self.m = len(self.capacity)
+
+        # sparse representation: per enrollment the reachable choices with their cost
+        self.options: List[List[Tuple[int, int]]] = []
+        for enrollment in enrollments:
+            edges: Dict[int, int] = {}
+            for rank, key in enumerate(ENROLLMENT_CHOICES):
+                choice = enrollment[key]
+                if choice and choice not in NONE_CHOICE:
+                    j = index.get(choice.strip())
+                    if j is not None and j not in edges:
+                        edges[j] = RANK_COSTS[rank]
+            edges[self.unassigned_node] = NO_ASSIGNMENT_COST
+            self.options.append(list(edges.items()))
+
+        self.assigned = [-1] * self.n
+        self.assigned_cost = [0] * self.n
+        self.members: List[Set[int]] = [set() for _ in range(self.m)]
+        self.load = [0] * self.m
+
+        # potentials keep the reduced costs non-negative
+        self.pi_enrollment = [0] * self.n
+        self.pi_choice = [0] * self.m
+        self.pi_sink = 0
+
+    def solve(self):
+        free = list(range(self.n))
+        while free:
+            self.update_potentials(free)
+
+            # augment along the paths with zero reduced cost until none are left
+            while True:
+                self.dead = [False] * self.m
+                self.queues: Dict[int, List[int]] = {}
+                self.cursors = [0] * self.m
+                progress = False
+                for e in free:
+                    if self.augment(e):
+                        progress = True
+                free = [e for e in free if self.assigned[e] < 0]
+                if not progress or not free:
+                    break
+
+    def update_potentials(self, free: List[int]):
+        """
+        Dijkstra from the free enrollments using the reduced costs; nodes are
+        encoded as enrollment index or n + choice index.
+        """
+        n = self.n
+        options = self.options
+        assigned = self.assigned
+        assigned_cost = self.assigned_cost
+        members = self.members
+        load = self.load
+        capacity = self.capacity
+        pi_enrollment = self.pi_enrollment
+        pi_choice = self.pi_choice
+
+        dist_enrollment = [INFINITY] * n
+        dist_choice = [INFINITY] * self.m
+        dist_sink = INFINITY
+        heap = []
+        for e in free:
+            dist_enrollment[e] = 0
+            heap.append((0, e))
+        heapq.heapify(heap)
+
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d >= dist_sink:
+                break
+            if node < n:
+                e = node
+                if d > dist_enrollment[e]:
+                    continue
+                base = d + pi_enrollment[e]
+                for j, cost in options[e]:
+                    if j == assigned[e]:
+                        continue
+                    nd = base + cost - pi_choice[j]
+                    if nd < dist_choice[j]:
+                        dist_choice[j] = nd
+                        heapq.heappush(heap, (nd, n + j))
+            else:
+                j = node - n
+                if d > dist_choice[j]:
+                    continue
+                base = d + pi_choice[j]
+                if load[j] < capacity[j] and base - self.pi_sink < dist_sink:
+                    dist_sink = base - self.pi_sink
+                for e in members[j]:
+                    nd = base - assigned_cost[e] - pi_enrollment[e]
+                    if nd < dist_enrollment[e]:
+                        dist_enrollment[e] = nd
+                        heapq.heappush(heap, (nd, e))
+
+        for e in range(n):
+            if dist_enrollment[e] < dist_sink:
+                pi_enrollment[e] += dist_enrollment[e]
+            else:
+                pi_enrollment[e] += dist_sink
+        for j in range(self.m):
+            pi_choice[j] += min(dist_choice[j], dist_sink)
+        self.pi_sink += dist_sink
+
+    def augment(self, start: int) -> bool:
+        """
+        Search a path of zero reduced cost from a free enrollment to a choice
+        with a free place, and move the enrollments along it.
+        """
+        options = self.options
+        assigned = self.assigned
+        pi_enrollment = self.pi_enrollment
+        pi_choice = self.pi_choice
+        dead = self.dead
+        cursors = self.cursors
+
+        potential = pi_enrollment[start]
+        if all(dead[j] or potential + cost != pi_choice[j] for j, cost in options[start]):
+            return False
+
+        on_path: Set[int] = set()
+
+        def moves(e: int):
+            # admissible edges: enrollment -> choice -> (sink or enrollment assigned to it)
+            for j, cost in options[e]:
+                if dead[j] or j in on_path or j == assigned[e] or pi_enrollment[e] + cost != pi_choice[j]:
+                    continue
+                if self.load[j] < self.capacity[j] and pi_choice[j] == self.pi_sink:
+                    yield j, cost, -1
+                    return
+                on_path.add(j)
+                queue = self.queue(j)
+                # members which didn't lead to a free place are skipped for the
+                # remainder of this pass
+                while cursors[j] < len(queue):
+                    other = queue[cursors[j]]
+                    if assigned[other] == j:
+                        yield j, cost, other
+                    cursors[j] += 1
+                on_path.remove(j)
+                dead[j] = True
+
+        path = [(start, -1, 0)]
+        stack = [moves(start)]
+        while stack:
+            try:
+                j, cost, other = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                path.pop()
+                continue
+
+            if other >= 0:
+                path.append((other, j, cost))
+                stack.append(moves(other))
+                continue
+
+            # found a free place: move every enrollment on the path to the next choice
+            path.append((-1, j, cost))
+            for (e, _, _), (_, target, target_cost) in zip(path, path[1:]):
+                if assigned[e] >= 0:
+                    self.members[assigned[e]].remove(e)
+                self.members[target].add(e)
+                assigned[e] = target
+                self.assigned_cost[e] = target_cost
+            self.load[j] += 1
+            return True
+
+        return False
+
+    def queue(self, j: int) -> List[int]:
+        # members of a choice which can move with zero reduced cost
+        try:
+            return self.queues[j]
+        except KeyError:
+            queue = [e for e in self.members[j]
+                     if self.pi_choice[j] - self.assigned_cost[e] == self.pi_enrollment[e]]
+            self.queues[j] = queue
+            return queue
+
+
+SOLVERS = {
+    'greedy': round_robin,
+    'optimal': min_cost_flow
+}
+
+
+# there is always room for a surprise
+RANDOM_CAPACITY = 999
+
+
+class MissingCapacities(Exception):
+    def __init__(self, choices: List[str]):
+        super().__init__("Capacity unknown for: " + ", ".join(choices))
+        self.choices = choices
+
+
+class AssignmentResult:
+    """
+    The outcome of an assignment: which enrollment got which choice, who
+    remained unassigned and the number of assignments per choice.
+    """
+
+    def __init__(self, capacities: Dict[str, int], counter: Dict[str, int]):
+        self.assignments: List[Tuple[Mapping[str, str], str]] = []
+        self.unassigned: List[Mapping[str, str]] = []
+        self.capacities = capacities
+        self.counter = counter
+        # the places left per choice, only kept while placing the surprises
+        self.free: Optional[Dict[str, int]] = None
+
+    def get_capacity(self, choice: str) -> Optional[int]:
+        if choice == RANDOM_CHOICE:
+            return RANDOM_CAPACITY
+        return self.capacities.get(choice)
+
+    def has_room(self, choice: str) -> bool:
+        capacity = self.get_capacity(choice)
+        return capacity is not None and self.counter.get(choice, 0) < capacity
+
+    def set_capacity(self, choice: str, capacity: Optional[int]):
+        self.capacities[choice] = capacity
+        if self.free is not None and choice != RANDOM_CHOICE:
+            if capacity is None:
+                self.free.pop(choice, None)
+            else:
+                self.free[choice] = capacity - self.counter.get(choice, 0)
+
+    def free_places(self) -> Dict[str, int]:
+        if self.free is not None:
+            return self.free
+        return {choice: self.get_capacity(choice) - self.counter.get(choice, 0)
+                for choice in set(self.capacities.keys()).union(self.counter.keys())
+                if choice != RANDOM_CHOICE and self.get_capacity(choice) is not None}
+
+    def ranks(self) -> List[int]:
+        """
+        The number of assignments to the first, second and third choice
+        """
+        ranks = [0] * len(ENROLLMENT_CHOICES)
+        for enrollment, assigned in self.assignments:
+            for rank, key in enumerate(ENROLLMENT_CHOICES):
+                if enrollment[key].strip() == assigned:
+                    ranks[rank] += 1
+                    break
+        return ranks
+
+
+SurprisePolicy = Callable[[Mapping[str, str], AssignmentResult], Optional[str]]
+
+
+def assign(enrollments: List[Mapping[str, str]],
+           capacities: Dict[str, Optional[int]],
+           history: EnrollmentCollection,
+           solver='greedy',
+           ask_capacity: Optional[Callable[[str], int]] = None,
+           surprise: Optional[SurprisePolicy] = None) -> AssignmentResult:
+    """
+    Assigns the enrollments (first enrollment first) to their choices.
+    None of the arguments are modified, so this can be called repeatedly
+    with the same (already loaded) history.
+
+    Unknown capacities are asked using `ask_capacity` before anything is
+    assigned; without it MissingCapacities is raised. Those who want to be
+    surprised are placed using the `surprise` policy, by default the
+    choice with the most free places they haven't done before. When the
+    policy returns None the enrollment remains unassigned.
+    """
+    result = prepare(enrollments, capacities, ask_capacity)
+    result.assignments += SOLVERS[solver](enrollments, open_choices(result), result.get_capacity, result.counter)
+    complete(result, enrollments, auto_policy(history) if surprise is None else surprise)
+
+    return result
+
+
+def chosen(enrollment: Mapping[str, str]) -> List[str]:
+    """
+    The choices of an enrollment, in order of preference
+    """
+    choices = []
+    for choice in map(lambda key: enrollment[key], ENROLLMENT_CHOICES):
+        if not choice or choice.strip() in NONE_CHOICE:
+            continue
+        else:
+            choices.append(choice.strip())
+    return choices
+
+
+def prepare(enrollments: List[Mapping[str, str]],
+            capacities: Dict[str, Optional[int]],
+            ask_capacity: Optional[Callable[[str], int]] = None) -> AssignmentResult:
+    """
+    An empty result in which all the chosen choices and their capacities
+    are known.
+    """
+    # Make sure all possible choices are known
+    counter: Dict[str, int] = {}
+    for enrollment in enrollments:
+        for choice in chosen(enrollment):
+            counter[choice] = 0
+
+    capacities = dict(capacities)
+    missing = missing_capacities(capacities, counter)
+    if missing and ask_capacity is None:
+        raise MissingCapacities(missing)
+    for choice in missing:
+        capacities[choice] = ask_capacity(choice)
+
+    return AssignmentResult(capacities, counter)
+
+
+def open_choices(result: AssignmentResult) -> List[str]:
+    # possible to close a department, choices which nobody chose might have
+    # no capacity
+    return [choice for choice in sorted(set(result.capacities.keys()).union(result.counter.keys()))
+            if result.get_capacity(choice) not in (0, None)]
+
+
+def complete(result: AssignmentResult, enrollments: List[Mapping[str, str]], surprise: SurprisePolicy):
+    """
+    Determines who remained unassigned and places those who want to be
+    surprised.
+    """
+    assigned_ids = set(id(enrollment) for (enrollment, _) in result.assignments)
+    result.unassigned = [enrollment for enrollment in enrollments if id(enrollment) not in assigned_ids]
+    reassign_random(result, surprise)
+
+
+def reassign_random(result: AssignmentResult, surprise: SurprisePolicy):
+    """
+    Places those who were assigned to RANDOM_CHOICE using the policy. The
+    placed surprises move to the end of the assignments and the others to
+    the end of the unassigned; both lists are rebuilt once afterwards.
+    """
+    placed: List[Tuple[Mapping[str, str], str]] = []
+    not_placed: List[Mapping[str, str]] = []
+    # updated in place instead of counted again for every surprise
+    result.free = result.free_places()
+    try:
+        for enrollment in list(enrollment for (enrollment, choice) in result.assignments
+                               if choice == RANDOM_CHOICE):
+            choice = surprise(enrollment, result)
+            if choice is not None and not result.has_room(choice):
+                raise ValueError(f"No room left for {choice}")
+
+            result.counter[RANDOM_CHOICE] -= 1
+
+            if choice is not None:
+                try:
+                    result.counter[choice] += 1
+                except KeyError:
+                    result.counter[choice] = 1
+                if choice in result.free:
+                    result.free[choice] -= 1
+                placed.append((enrollment, choice))
+            else:
+                not_placed.append(enrollment)
+    finally:
+        result.free = None
+
+    if placed or not_placed:
+        result.assignments = [(enrollment, choice) for (enrollment, choice) in result.assignments
+                              if choice != RANDOM_CHOICE] + placed
+        result.unassigned += not_placed
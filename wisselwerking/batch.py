@@ -0,0 +1,168 @@
+import contextlib
+import csv
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .assign import SOLVERS, MissingCapacities, assign
+from .capacities import read_capacities
+from .enrollments import read_enrollments
+from .history import EnrollmentCollection, normalizer
+from .output import write_assignments, write_organizer_files
+from .settings import output_file, ENROLLMENT_MAIL, RANDOM_CHOICE
+from .surprise import auto_policy, placement_policy, read_placements
+
+# the columns of the manifest
+MANIFEST_EXPORT = 'formulier'
+MANIFEST_CAPACITIES = 'capaciteiten'
+MANIFEST_OUTPUT = 'uitvoer'
+MANIFEST_SOLVER = 'solver'
+MANIFEST_SURPRISES = 'verrassingen'
+
+
+class BatchJob:
+    def __init__(self,
+                 export: str,
+                 capacities: str,
+                 output_dir: str,
+                 solver='greedy',
+                 surprises: Optional[str] = None):
+        self.export = export
+        self.capacities = capacities
+        self.output_dir = output_dir
+        self.solver = solver
+        self.surprises = surprises
+
+
+class JobSummary:
+    """
+    The outcome of a job, or the error which stopped it
+    """
+
+    def __init__(self, job: BatchJob):
+        self.job = job
+        self.error: Optional[str] = None
+        self.enrollments = 0
+        self.counts: Dict[str, int] = {}
+        # choices with a capacity but without assignments
+        self.empty: List[str] = []
+        self.unassigned: List[str] = []
+        self.ranks: List[int] = []
+        self.organizer_files = (0, 0, 0)
+        self.seconds = 0.0
+        # what the job printed
+        self.log = ''
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'export': self.job.export,
+            'output_dir': self.job.output_dir,
+            'solver': self.job.solver,
+            'error': self.error,
+            'enrollments': self.enrollments,
+            'counts': self.counts,
+            'empty': self.empty,
+            'unassigned': self.unassigned,
+            'ranks': self.ranks,
+            'organizer_files': dict(zip(['written', 'unchanged', 'removed'], self.organizer_files)),
+            'seconds': round(self.seconds, 3)
+        }
+
+
+def read_manifest(path: str) -> List[BatchJob]:
+    """
+    Reads the jobs, paths are relative to the manifest
+    """
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(value: Optional[str]) -> Optional[str]:
+        return os.path.join(base, value.strip()) if value and value.strip() else None
+
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        jobs = []
+        for row in csv.DictReader(csv_file, delimiter=';'):
+            solver = (row.get(MANIFEST_SOLVER) or 'greedy').strip()
+            if solver not in SOLVERS:
+                raise ValueError(f"Unknown solver in {path}: {solver}")
+            jobs.append(BatchJob(resolve(row[MANIFEST_EXPORT]),
+                                 resolve(row[MANIFEST_CAPACITIES]),
+                                 resolve(row[MANIFEST_OUTPUT]),
+                                 solver,
+                                 resolve(row.get(MANIFEST_SURPRISES))))
+        return jobs
+
+
+# the history of the worker process, sent once when it starts
+_history: Optional[EnrollmentCollection] = None
+
+
+def _init_worker(history: EnrollmentCollection, renames_path: str):
+    global _history
+    _history = history
+    normalizer.reload(renames_path)
+
+
+def run_job(job: BatchJob, history: Optional[EnrollmentCollection] = None) -> JobSummary:
+    """
+    Assigns the enrollments of a job and writes its output. Never raises:
+    a failing job is reported in its summary.
+    """
+    if history is None:
+        history = _history
+    summary = JobSummary(job)
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            enrollments, form_fieldnames = read_enrollments(job.export)
+            summary.enrollments = len(enrollments)
+            capacities = read_capacities(job.capacities)
+            surprise = auto_policy(history)
+            if job.surprises:
+                surprise = placement_policy(read_placements(job.surprises), surprise)
+
+            result = assign(enrollments, capacities, history, solver=job.solver, surprise=surprise)
+
+            os.makedirs(job.output_dir, exist_ok=True)
+            target = os.path.join(job.output_dir, output_file)
+            write_assignments(target, result.assignments, form_fieldnames)
+            summary.organizer_files = write_organizer_files(target, result.assignments, result.counter)
+
+        summary.counts = {choice: count for choice, count in sorted(result.counter.items()) if count}
+        summary.empty = sorted(choice for choice in set(result.capacities).union(result.counter)
+                               if not result.counter.get(choice, 0) and choice != RANDOM_CHOICE)
+        summary.unassigned = [enrollment[ENROLLMENT_MAIL] for enrollment in result.unassigned]
+        summary.ranks = result.ranks()
+    except MissingCapacities as error:
+        summary.error = f"capaciteit onbekend: {', '.join(error.choices)}"
+    except OSError as error:
+        summary.error = str(error)
+    except Exception:
+        summary.error = traceback.format_exc()
+    summary.log = log.getvalue()
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def run_batch(jobs: List[BatchJob], history: EnrollmentCollection, workers: Optional[int] = None) -> List[JobSummary]:
+    """
+    Runs the jobs in a pool of processes, each process receives the
+    history once. Returns the summaries in the order of the jobs.
+    """
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(history, os.path.abspath(normalizer.path))) as executor:
+        futures = [executor.submit(run_job, job) for job in jobs]
+        summaries = []
+        for job, future in zip(jobs, futures):
+            try:
+                summaries.append(future.result())
+            except Exception:
+                # e.g. the worker process died
+                summary = JobSummary(job)
+                summary.error = traceback.format_exc()
+                summaries.append(summary)
+        return summaries
@@ -0,0 +1,83 @@
+import os
+import pickle
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# increase when the cached representation changes
+CACHE_VERSION = 2
+
+
+class HistoryCache:
+    """
+    Local cache of the parsed enrollments per year file. An entry is only
+    used when the path, modification time and size of the file are unchanged.
+    """
+
+    def __init__(self, path: str, refresh=False, fingerprint: Any = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries: Dict[str, Tuple[int, int, List[Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        # files of which the entries are still relevant
+        self.seen = set()
+        # the year files can be read concurrently
+        self.lock = threading.Lock()
+
+        if refresh or not os.path.isfile(path):
+            return
+
+        try:
+            with open(path, mode="rb") as cache_file:
+                version, fingerprint, entries = pickle.load(cache_file)
+        except Exception:
+            # unreadable or outdated cache: start over
+            return
+
+        if version == CACHE_VERSION and fingerprint == self.fingerprint:
+            self.entries = entries
+
+    def get(self, filepath: str) -> Optional[List[Any]]:
+        stat = os.stat(filepath)
+        key = os.path.abspath(filepath)
+        with self.lock:
+            self.seen.add(key)
+            try:
+                mtime, size, items = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            if mtime != stat.st_mtime_ns or size != stat.st_size:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return items
+
+    def put(self, filepath: str, items: List[Any]):
+        stat = os.stat(filepath)
+        key = os.path.abspath(filepath)
+        with self.lock:
+            self.seen.add(key)
+            self.entries[key] = (stat.st_mtime_ns, stat.st_size, items)
+            self.dirty = True
+
+    def save(self):
+        # forget files which were (re)moved
+        for key in list(self.entries):
+            if key not in self.seen:
+                del self.entries[key]
+                self.dirty = True
+
+        if not self.dirty:
+            return
+
+        # write to a temporary file first, an interrupted run shouldn't corrupt the cache
+        temp_path = self.path + ".tmp"
+        with open(temp_path, mode="wb") as cache_file:
+            pickle.dump((CACHE_VERSION, self.fingerprint, self.entries),
+                        cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        self.dirty = False
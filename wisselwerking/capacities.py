@@ -0,0 +1,47 @@
+import csv
+import os
+from typing import Dict, Iterable, List, Optional
+
+from .settings import CAPACITY_CHOICE, CAPACITY_VALUE, RANDOM_CHOICE
+
+
+def read_capacities(path: str) -> Dict[str, Optional[int]]:
+    capacities: Dict[str, Optional[int]] = {}
+    if not os.path.exists(path):
+        return capacities
+
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        csv_reader = csv.DictReader(csv_file, delimiter=';')
+
+        for row in csv_reader:
+            try:
+                capacity = int(row[CAPACITY_VALUE])
+            except ValueError:
+                capacity = None
+            except TypeError:
+                capacity = None
+            capacities[row[CAPACITY_CHOICE]] = capacity
+
+    return capacities
+
+
+def save_capacities(path: str, capacities: Dict[str, Optional[int]]):
+    with open(path, mode="w", encoding="utf-8-sig") as csv_file:
+        fieldnames = [CAPACITY_CHOICE, CAPACITY_VALUE]
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=';')
+
+        writer.writeheader()
+        for (choice, value) in capacities.items():
+            writer.writerow({
+                CAPACITY_CHOICE: choice,
+                CAPACITY_VALUE: value
+            })
+
+
+def missing_capacities(capacities: Dict[str, Optional[int]], choices: Iterable[str]) -> List[str]:
+    """
+    The chosen choices of which the capacity is not known yet, choices which
+    nobody chose can be left empty
+    """
+    return sorted(choice for choice in set(choices)
+                  if choice != RANDOM_CHOICE and capacities.get(choice) is None)
@@ -0,0 +1,86 @@
+import csv
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+from .settings import renames_file
+
+WHITESPACE = re.compile(r'\s+')
+
+# number of distinct department names which are remembered
+NORMALIZER_CACHE_SIZE = 4096
+
+# renames.csv is part of the repository, so it is found from any working
+# directory
+DEFAULT_RENAMES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), renames_file)
+
+
+class DepartmentNormalizer:
+    """
+    Gives the canonical name of a department: renamed to its current name
+    (if known) and with normalized whitespace and dashes. The result is
+    remembered, so each name is only normalized once.
+
+    The renames are read from `path` when they are first needed.
+    """
+
+    def __init__(self, path=DEFAULT_RENAMES_PATH, cache_size=NORMALIZER_CACHE_SIZE):
+        self.path = path
+        self.__renames: Optional[Dict[str, str]] = None
+        self.__cached = lru_cache(maxsize=cache_size)(self.__normalize)
+
+    @property
+    def renames(self) -> Dict[str, str]:
+        if self.__renames is None:
+            self.__renames = read_renames(self.path)
+        return self.__renames
+
+    def reload(self, path: Optional[str] = None):
+        """
+        Reads the renames again on next use, optionally from another file.
+        """
+        if path is not None:
+            self.path = path
+        self.__renames = None
+        self.__cached.cache_clear()
+
+    def __call__(self, department: str) -> str:
+        return self.__cached(department)
+
+    def __normalize(self, department: str) -> str:
+        department = department.replace('\u2013', '-')
+        department = WHITESPACE.sub(' ', department)
+        department = department.strip()
+        try:
+            return self.renames[department.lower()]
+        except KeyError:
+            return department
+
+    @property
+    def hits(self) -> int:
+        return self.__cached.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        return self.__cached.cache_info().misses
+
+    def clear(self):
+        self.__cached.cache_clear()
+
+
+def read_renames(path: str) -> Dict[str, str]:
+    """
+    Reads the old names of courses with their new names
+    """
+    renames: Dict[str, str] = {}
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        csv_reader = csv.DictReader(csv_file, delimiter=';')
+
+        for row in csv_reader:
+            old = row['old'].lower().strip()
+            new = row['new'].strip()
+            renames[old] = new
+            renames[new.lower()] = new
+
+    return renames
@@ -0,0 +1,214 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .settings import DUPLICATE_THRESHOLD, ENROLLMENT_FIRSTNAME, ENROLLMENT_LASTNAME, ENROLLMENT_MAIL
+
+# ignored when comparing names: "Anna de Vries" is "Anna Vries"
+NAME_PARTICLES = {'van', 'von', 'de', 'der', 'den', 'die', 'het', 'ter', 'ten', 't', 'la', 'le', 'du'}
+
+# larger blocks (very common names) are too unspecific to compare
+MAX_BLOCK = 100
+
+# shorter local parts give too many typo matches
+MIN_TYPO_LENGTH = 6
+
+FORM_SOURCE = 'formulier'
+HISTORY_SOURCE = 'voorgaande jaren'
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Lowercase without accents and punctuation: "Zoë O'Neill" is "zoe oneill"
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r"[^a-z0-9 ]+", '', re.sub(r"[-_.]+", ' ', text)).split())
+
+
+def name_parts(first_name: Optional[str], last_name: Optional[str]) -> Tuple[List[str], List[str]]:
+    return [part for part in normalize(first_name).split()], \
+        [part for part in normalize(last_name).split() if part not in NAME_PARTICLES]
+
+
+def mail_local(email: str) -> str:
+    """
+    The mailbox without the domain, punctuation and +tag
+    """
+    local = email.lower().strip().split('@')[0].split('+')[0]
+    return re.sub(r"[^a-z0-9]+", '', local)
+
+
+def mail_initial_name(email: str) -> Optional[str]:
+    """
+    Initial and last name of an address like j.de.vries@uu.nl (jvries)
+    """
+    parts = [part for part in normalize(email.split('@')[0]).split() if part not in NAME_PARTICLES]
+    if len(parts) < 2 or not parts[-1].isalpha():
+        return None
+    return parts[0][0] + parts[-1]
+
+
+class Participant:
+    __slots__ = ['email', 'name', 'source', 'signatures']
+
+    def __init__(self,
+                 email: Optional[str],
+                 source: str,
+                 first_name: Optional[str] = None,
+                 last_name: Optional[str] = None):
+        self.email = (email or '').lower().strip()
+        self.source = source
+        self.name: Optional[str] = None
+        # what can be compared: the full name, the local part of the mail
+        # address and the initial with last name
+        self.signatures: Dict[str, str] = {}
+
+        local = mail_local(self.email)
+        if local:
+            self.signatures['mail'] = local
+
+        first, last = name_parts(first_name, last_name)
+        if first and last:
+            self.name = ' '.join(first + last)
+            self.signatures['naam'] = ' '.join(sorted(first + last))
+            self.signatures['initiaal'] = first[0][0] + last[-1]
+        else:
+            initial_name = mail_initial_name(self.email)
+            if initial_name:
+                self.signatures['initiaal'] = initial_name
+
+    def blocking_keys(self) -> Set[Hashable]:
+        keys: Set[Hashable] = set((kind, value) for kind, value in self.signatures.items())
+        for kind in ['mail', 'initiaal']:
+            value = self.signatures.get(kind)
+            if value and len(value) >= MIN_TYPO_LENGTH:
+                # a single typo: both share the value with one character
+                # removed (or the value itself)
+                keys.add(('typo', kind, value))
+                # the initial itself is not a typo: that would compare
+                # everyone with the same last name
+                keys.update(('typo', kind, value[:i] + value[i + 1:])
+                            for i in range(1 if kind == 'initiaal' else 0, len(value)))
+        return keys
+
+
+class DuplicatePair:
+    __slots__ = ['score', 'reason', 'first', 'second']
+
+    def __init__(self, score: float, reason: str, first: Participant, second: Participant):
+        self.score = score
+        self.reason = reason
+        self.first = first
+        self.second = second
+
+
+def similarity(first: Participant, second: Participant, threshold=0.0) -> Tuple[float, str]:
+    """
+    The best matching signature of the two participants, signatures which
+    can't reach the threshold are skipped.
+    """
+    best = (0.0, '')
+    for kind, value in first.signatures.items():
+        if kind == 'initiaal' and 'naam' in first.signatures and 'naam' in second.signatures:
+            # the full names say more
+            continue
+        other = second.signatures.get(kind)
+        if other is None:
+            continue
+        if value == other:
+            return 1.0, kind
+        matcher = SequenceMatcher(None, value, other)
+        # cheap upper bounds first
+        bound = max(threshold, best[0])
+        if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+            continue
+        score = matcher.ratio()
+        if score > best[0]:
+            best = (score, kind)
+    return best
+
+
+def form_participants(enrollments: Iterable[Mapping[str, str]]) -> List[Participant]:
+    # incomplete rows might not have a mail address
+    return [Participant(enrollment[ENROLLMENT_MAIL],
+                        FORM_SOURCE,
+                        enrollment[ENROLLMENT_FIRSTNAME],
+                        enrollment[ENROLLMENT_LASTNAME])
+            for enrollment in enrollments
+            if (enrollment[ENROLLMENT_MAIL] or '').strip()]
+
+
+def history_participants(history, exclude: Set[str]) -> List[Participant]:
+    """
+    The previous participants (only known by their mail address) except
+    those who enrolled again with the same address
+    """
+    return [Participant(email, HISTORY_SOURCE)
+            for email in history.count_by('email')
+            if email.lower().strip() not in exclude]
+
+
+def find_duplicates(enrollments: List[Mapping[str, str]],
+                    history=None,
+                    threshold=DUPLICATE_THRESHOLD,
+                    skipped: Optional[List[Tuple[Hashable, int]]] = None) -> List[DuplicatePair]:
+    """
+    Finds participants of the form who enrolled more than once (with
+    another address) or previously participated with another address.
+
+    Only participants sharing a blocking key (name, address or initial
+    with last name, or an address with one typo) are compared, which keeps
+    this near-linear. Returns the pairs with the highest score first.
+
+    Blocks larger than MAX_BLOCK are not compared, these are added to
+    `skipped` (key and number of participants) when given.
+    """
+    participants = form_participants(enrollments)
+    if history is not None:
+        participants += history_participants(history, set(participant.email for participant in participants))
+
+    blocks: Dict[Hashable, List[int]] = {}
+    for index, participant in enumerate(participants):
+        for key in participant.blocking_keys():
+            try:
+                blocks[key].append(index)
+            except KeyError:
+                blocks[key] = [index]
+
+    compared: Set[Tuple[int, int]] = set()
+    pairs: List[DuplicatePair] = []
+    # members of the blocks which are too large -> their keys
+    too_large: Dict[FrozenSet[int], List[Hashable]] = {}
+    for key, members in blocks.items():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BLOCK:
+            # only a problem when there's someone of the form to compare
+            if skipped is not None and any(participants[index].source == FORM_SOURCE for index in members):
+                too_large.setdefault(frozenset(members), []).append(key)
+            continue
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                a, b = participants[first], participants[second]
+                # previous participants are only compared to the form
+                if a.source != FORM_SOURCE and b.source != FORM_SOURCE:
+                    continue
+                if a.email == b.email or (first, second) in compared:
+                    continue
+                compared.add((first, second))
+                score, reason = similarity(a, b, threshold)
+                if score >= threshold:
+                    pairs.append(DuplicatePair(score, reason, a, b))
+
+    if skipped is not None:
+        # the same participants share many keys (such as the typos of their
+        # name), the shortest key says the most
+        skipped += sorted(((min(keys, key=lambda key: (len(key), key)), len(members))
+                           for members, keys in too_large.items()),
+                          key=lambda item: (-item[1], item[0]))
+
+    pairs.sort(key=lambda pair: (-pair.score, pair.first.email, pair.second.email))
+    return pairs
+
@@ -0,0 +1,88 @@
+import csv
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .settings import ENROLLMENT_SOURCE, ENROLLMENT_FIRSTNAME, ENROLLMENT_LASTNAME, ENROLLMENT_MAIL
+
+
+class FormEnrollment(Mapping):
+    """
+    A row of the form export. The values are kept as a tuple and the column
+    positions are shared by all the rows, which is much more compact than a
+    dictionary per row.
+    """
+    __slots__ = ['columns', 'values']
+
+    def __init__(self, columns: Dict[str, int], values: List[str]):
+        self.columns = columns
+        self.values = tuple(values)
+
+    def __getitem__(self, key: str) -> Optional[str]:
+        index = self.columns[key]
+        try:
+            return self.values[index]
+        except IndexError:
+            # incomplete row
+            return None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    # rows are unique: compare on identity instead of on all the values
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+def format_name(enrollment: Mapping, include_lastname=False) -> str:
+    first_name = str.join(' ',
+                          (part.capitalize() for part in enrollment[ENROLLMENT_FIRSTNAME].strip().split(' ')))
+    if include_lastname:
+        parts = []
+        for part in enrollment[ENROLLMENT_LASTNAME].strip().split(' '):
+            if part.lower() in ['van', 'von', 'de', 'der', 'den', 'die']:
+                parts.append(part.lower())
+            else:
+                parts.append(part.capitalize())
+        return first_name + ' ' + str.join(' ', parts)
+
+    return first_name
+
+
+def without_tests(rows: Iterable[FormEnrollment]) -> Iterator[FormEnrollment]:
+    for row in rows:
+        if row[ENROLLMENT_SOURCE] != "Test":
+            yield row
+
+
+def unique_emails(rows: Iterable[FormEnrollment]) -> Iterator[FormEnrollment]:
+    seen = set()
+    for row in rows:
+        # incomplete rows have no mail address
+        mail = (row[ENROLLMENT_MAIL] or '').lower().strip()
+        if mail in seen:
+            print("DUBBELE DEELNEMER: " + mail)
+        else:
+            seen.add(mail)
+            yield row
+
+
+def read_enrollments(filename: str) -> Tuple[List[FormEnrollment], List[str]]:
+    """
+    Reads the enrollments from the form export, with the first enrollment
+    first. Returns these together with the columns of the form.
+    """
+    with open(filename, mode="r", encoding='iso8859-15') as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=';')
+        fieldnames = next(csv_reader)
+        columns = {fieldname: index for index, fieldname in enumerate(fieldnames)}
+
+        # skip empty lines
+        rows = (FormEnrollment(columns, values) for values in csv_reader if values)
+        enrollments = list(unique_emails(without_tests(rows)))
+
+    # the top row is the last entry
+    enrollments.reverse()
+    return enrollments, fieldnames
@@ -0,0 +1,135 @@
+import csv
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_DEPT, HISTORY_HOW_MANY, HISTORY_YEARS
+from .statistics import HISTORY_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    # optional: the export falls back to CSV
+    pyarrow = None
+
+EXPORT_FORMATS = ['parquet', 'arrow', 'csv']
+
+EXTENSIONS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+    'csv': 'csv'
+}
+
+# the tables of the export, each partitioned by years: the years come from
+# the directory of the partition (jaren=2019-2020) and are not repeated in
+# the files, otherwise readers can't merge the two
+TABLES = {
+    'enrollments': [column for column in HISTORY_COLUMNS if column != HISTORY_YEARS],
+    'per_year': ['enrollments', 'participants', 'first_time', 'assigned_depts', 'from_depts'],
+    'per_department': [ENROLLMENT_DEPT, 'from_count', 'assigned_count'],
+    'participation': [HISTORY_HOW_MANY, 'count']
+}
+
+
+def default_format() -> str:
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+class HistoryExport:
+    """
+    Columnar export of the anonymised history (the rows of history.csv)
+    with aggregates per year, per department and by participation count.
+    Each year is a separate partition (`jaren=2019-2020`), so a new year
+    can be added without rewriting the previous years.
+    """
+
+    def __init__(self, path: str, format: Optional[str] = None):
+        if format is None:
+            format = default_format()
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        if format != 'csv' and pyarrow is None:
+            raise ImportError(f"pyarrow is needed for the {format} export")
+        self.path = path
+        self.format = format
+
+    def partition(self, table: str, years: str) -> str:
+        return os.path.join(self.path, table, f"{HISTORY_YEARS}={years}", f"part-0.{EXTENSIONS[self.format]}")
+
+    def has_years(self, years: Iterable[str]) -> bool:
+        return all(os.path.isfile(self.partition(table, year)) for year in years for table in TABLES)
+
+    def clear(self):
+        for table in TABLES:
+            shutil.rmtree(os.path.join(self.path, table), ignore_errors=True)
+
+    def add_year(self, years: str, rows: List[Dict[str, object]]):
+        """
+        Writes the partitions of a year, the aggregates are gathered while
+        going through the rows once.
+        """
+        columns: Dict[str, List[object]] = {column: [] for column in TABLES['enrollments']}
+        participants = set()
+        first_time = 0
+        # department -> [from count, assigned count]
+        departments: Dict[str, List[int]] = {}
+        participation: Dict[int, int] = {}
+
+        for row in rows:
+            for column in TABLES['enrollments']:
+                columns[column].append(row[column])
+            participants.add(row['id'])
+            how_many = row[HISTORY_HOW_MANY]
+            if how_many == 1:
+                first_time += 1
+            participation[how_many] = participation.get(how_many, 0) + 1
+            try:
+                departments[row[ENROLLMENT_DEPT]][0] += 1
+            except KeyError:
+                departments[row[ENROLLMENT_DEPT]] = [1, 0]
+            try:
+                departments[row[ASSIGNED_CHOICE]][1] += 1
+            except KeyError:
+                departments[row[ASSIGNED_CHOICE]] = [0, 1]
+
+        self.__write('enrollments', years, columns)
+        self.__write('per_year', years, {
+            'enrollments': [len(rows)],
+            'participants': [len(participants)],
+            'first_time': [first_time],
+            'assigned_depts': [sum(1 for counts in departments.values() if counts[1])],
+            'from_depts': [sum(1 for counts in departments.values() if counts[0])]
+        })
+        names = sorted(departments)
+        self.__write('per_department', years, {
+            ENROLLMENT_DEPT: names,
+            'from_count': [departments[name][0] for name in names],
+            'assigned_count': [departments[name][1] for name in names]
+        })
+        times = sorted(participation)
+        self.__write('participation', years, {
+            HISTORY_HOW_MANY: times,
+            'count': [participation[how_many] for how_many in times]
+        })
+
+    def __write(self, table: str, years: str, columns: Dict[str, List[object]]):
+        target = self.partition(table, years)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # hidden from readers of the dataset while it is written
+        temp_path = os.path.join(os.path.dirname(target), '.' + os.path.basename(target) + '.tmp')
+
+        if self.format == 'csv':
+            with open(temp_path, mode="w", encoding="utf-8-sig", newline="") as csv_file:
+                writer = csv.writer(csv_file, delimiter=';')
+                writer.writerow(TABLES[table])
+                writer.writerows(zip(*(columns[column] for column in TABLES[table])))
+        else:
+            data = pyarrow.Table.from_pydict({column: columns[column] for column in TABLES[table]})
+            if self.format == 'parquet':
+                pyarrow.parquet.write_table(data, temp_path)
+            else:
+                pyarrow.feather.write_feather(data, temp_path)
+
+        os.replace(temp_path, target)
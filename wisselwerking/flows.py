@@ -0,0 +1,120 @@
+import csv
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_DEPT, HISTORY_YEARS
+
+
+def encode(values: List[str], names: Dict[str, int]) -> np.ndarray:
+    """
+    Codes the values as integers, in order of first appearance (new names
+    are added to `names`)
+    """
+    return np.fromiter((names.setdefault(value, len(names)) for value in values), dtype=np.int64, count=len(values))
+
+
+def sorted_codes(names: Dict[str, int]) -> Tuple[List[str], np.ndarray]:
+    """
+    The names in sorted order and the new code of each old code
+    """
+    ordered = sorted(names)
+    recode = np.empty(len(names), dtype=np.int64)
+    recode[[names[name] for name in ordered]] = np.arange(len(ordered))
+    return ordered, recode
+
+
+class DepartmentFlows:
+    """
+    Per years the number of participants from each department (rows)
+    assigned to each department (columns). The departments are the names
+    after `rename_dept`, the same for all the years.
+    """
+
+    def __init__(self, years: List[str], departments: List[str], counts: np.ndarray):
+        self.years = years
+        self.departments = departments
+        # [years, from department, assigned department]
+        self.counts = counts
+
+    @staticmethod
+    def from_history(history) -> 'DepartmentFlows':
+        rows = list(history.to_rows())
+        if not rows:
+            return DepartmentFlows([], [], np.zeros((0, 0, 0), dtype=np.int64))
+
+        # email, years, from department, assigned department
+        _, years, from_depts, assigned_depts = zip(*rows)
+        year_codes: Dict[str, int] = {}
+        year_index = encode(years, year_codes)
+        dept_codes: Dict[str, int] = {}
+        from_index = encode(from_depts, dept_codes)
+        assigned_index = encode(assigned_depts, dept_codes)
+
+        year_names, recode_years = sorted_codes(year_codes)
+        departments, recode_depts = sorted_codes(dept_codes)
+        year_index = recode_years[year_index]
+        from_index = recode_depts[from_index]
+        assigned_index = recode_depts[assigned_index]
+
+        y, d = len(year_names), len(departments)
+        counts = np.bincount((year_index * d + from_index) * d + assigned_index, minlength=y * d * d)
+        return DepartmentFlows(year_names, departments, counts.reshape(y, d, d))
+
+    @staticmethod
+    def load(path: str) -> 'DepartmentFlows':
+        with np.load(path) as data:
+            return DepartmentFlows(data['years'].tolist(), data['departments'].tolist(), data['counts'])
+
+    def save(self, path: str):
+        np.savez_compressed(path,
+                            years=np.array(self.years, dtype=str),
+                            departments=np.array(self.departments, dtype=str),
+                            counts=self.counts)
+
+    def total(self) -> np.ndarray:
+        return self.counts.sum(axis=0)
+
+    def sent(self) -> np.ndarray:
+        """
+        [years, department] participants from each department
+        """
+        return self.counts.sum(axis=2)
+
+    def received(self) -> np.ndarray:
+        """
+        [years, department] participants assigned to each department
+        """
+        return self.counts.sum(axis=1)
+
+    def never_exchanged(self) -> List[Tuple[str, str]]:
+        """
+        The pairs of departments which never had a participant from the
+        one at the other (in either direction) even though at least one of
+        them received participants
+        """
+        total = self.total()
+        exchanged = (total + total.T) > 0
+        hosts = total.sum(axis=0) > 0
+        candidates = np.triu(hosts[:, None] | hosts[None, :], k=1)
+        first, second = np.nonzero(candidates & ~exchanged)
+        return [(self.departments[i], self.departments[j]) for i, j in zip(first, second)]
+
+    def write_csv(self, path: str):
+        """
+        The flows which occurred, one row per years and pair of departments
+        """
+        year, from_dept, assigned_dept = np.nonzero(self.counts)
+        with open(path, mode="w", encoding="utf-8-sig", newline="") as csv_file:
+            writer = csv.writer(csv_file, delimiter=';')
+            writer.writerow([HISTORY_YEARS, ENROLLMENT_DEPT, ASSIGNED_CHOICE, 'count'])
+            writer.writerows((self.years[y], self.departments[f], self.departments[a], count)
+                             for y, f, a, count
+                             in zip(year, from_dept, assigned_dept, self.counts[year, from_dept, assigned_dept]))
+
+
+def write_never_exchanged(path: str, pairs: List[Tuple[str, str]]):
+    with open(path, mode="w", encoding="utf-8-sig", newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerow([ENROLLMENT_DEPT, 'other_dept'])
+        writer.writerows(pairs)
@@ -2,204 +2,261 @@
 import csv
 import os
 import re
-from typing import Dict, Tuple, List
-from .settings import ASSIGNED_CHOICE, ENROLLMENT_MAIL, ENROLLMENT_DEPT,  HISTORY_YEARS, HISTORY_HOW_MANY
+import sys
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, Tuple, List, Optional
+from .cache import HistoryCache
+from .departments import DepartmentNormalizer
+from .statistics import HISTORY_COLUMNS, HistoryStatistics, enrollment_row, renames_fingerprint, year_digest
+from .settings import ENROLLMENT_MAIL, ENROLLMENT_DEPT, HISTORY_WORKERS
+
+if TYPE_CHECKING:
+    from .export import HistoryExport
 
 
 class Enrollment:
-    def __init__(self, email: str, years: Tuple[int, int], from_dept: str, assigned_dept: str):
-        self.email = email
-        self.years = years
-        self.from_dept = from_dept
-        self.assigned_dept = assigned_dept
+    # histories span decades: no dictionary per instance and the strings
+    # and years are shared between all the enrollments
+    __slots__ = ['email', 'years', 'from_dept', 'assigned_dept']
+
+    def __init__(self, email: str, years: Tuple[int, ...], from_dept: str, assigned_dept: str):
+        self.email = sys.intern(email)
+        self.years = shared_years(years)
+        self.from_dept = sys.intern(from_dept)
+        self.assigned_dept = sys.intern(assigned_dept)
+
+
+# one tuple for each distinct years
+_shared_years: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+def shared_years(years: Iterable[int]) -> Tuple[int, ...]:
+    years = tuple(years)
+    return _shared_years.setdefault(years, years)
+
+
+# the attributes on which an EnrollmentCollection can be queried
+INDEX_KEYS: Dict[str, Callable[[Enrollment], Hashable]] = {
+    'email': lambda enrollment: enrollment.email,
+    'years': lambda enrollment: enrollment.years,
+    'from_dept': lambda enrollment: enrollment.from_dept,
+    'assigned_dept': lambda enrollment: enrollment.assigned_dept
+}
 
 
 class EnrollmentCollection:
     def __init__(self, items: List[Enrollment]):
         self.items = items
         self.ids = {}
+        # built on first use and kept up-to-date by add()
+        self.__indexes: Dict[str, Dict[Hashable, List[Enrollment]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, enrollment: Enrollment):
+        self.items.append(enrollment)
+        for attribute, index in self.__indexes.items():
+            self.__add_to_index(index, attribute, enrollment)
+
+    def __add_to_index(self, index: Dict[Hashable, List[Enrollment]], attribute: str, enrollment: Enrollment):
+        key = INDEX_KEYS[attribute](enrollment)
+        try:
+            index[key].append(enrollment)
+        except KeyError:
+            index[key] = [enrollment]
+
+    def __index(self, attribute: str) -> Dict[Hashable, List[Enrollment]]:
+        try:
+            return self.__indexes[attribute]
+        except KeyError:
+            index: Dict[Hashable, List[Enrollment]] = {}
+            for enrollment in self.items:
+                self.__add_to_index(index, attribute, enrollment)
+            self.__indexes[attribute] = index
+            return index
 
     def to_rows(self):
         for enrollment in self.items:
-            yield [enrollment.email, f'{enrollment.years[0]}-{enrollment.years[1]}', enrollment.from_dept, enrollment.assigned_dept]
+            yield enrollment_row(enrollment)
 
     def list_from_depts(self):
-        depts = set()
-        for enrollment in self.items:
-            depts.add(enrollment.from_dept)
-        return depts
+        return set(self.__index('from_dept'))
 
     def list_assigned(self):
-        depts = set()
-        for enrollment in self.items:
-            depts.add(enrollment.assigned_dept)
-        return depts
+        return set(self.__index('assigned_dept'))
 
     def by_email(self, email):
-        for item in self.items:
-            if item.email == email:
-                yield item
+        return iter(self.__index('email').get(email, []))
+
+    def by_years(self, years: Tuple[int, int]):
+        return iter(self.__index('years').get(tuple(years), []))
+
+    def by_from_dept(self, dept: str):
+        return iter(self.__index('from_dept').get(dept, []))
+
+    def by_assigned_dept(self, dept: str):
+        return iter(self.__index('assigned_dept').get(dept, []))
+
+    def count_by(self, attribute: str) -> Dict[Hashable, int]:
+        return {key: len(enrollments) for key, enrollments in self.__index(attribute).items()}
+
+    def count_assigned(self) -> Dict[str, int]:
+        return self.count_by('assigned_dept')
+
+    def per_year(self) -> Dict[str, List[Enrollment]]:
+        """
+        The enrollments per years, ordered by the start year and within that
+        in order of appearance
+        """
+        index = self.__index('years')
+        return {f'{years[0]}-{years[1]}': index[years] for years in sorted(index, key=lambda years: years[0])}
+
+    def statistics(self) -> HistoryStatistics:
+        """
+        The statistics of all the years, only in memory
+        """
+        statistics = HistoryStatistics()
+        for years, enrollments in self.per_year().items():
+            statistics.add_year(years, enrollments)
+        return statistics
+
+    def to_csv(self, statistics_file: Optional[str] = None, rebuild=False, export: Optional['HistoryExport'] = None):
+        """
+        Writes the anonymised statistics. When a `statistics_file` is given,
+        the statistics are stored there and on a next run only the years
+        which were added since are processed (unless `rebuild` is set, or
+        a processed year or the renames of the departments changed).
+        The participant ids remain the same in both cases.
+
+        The processed years are also added to the (columnar) `export`.
+        """
+        per_year = self.per_year()
+        renames = renames_fingerprint(normalizer.renames)
+
+        statistics = None
+        if statistics_file is not None:
+            statistics = HistoryStatistics.load(statistics_file)
+
+        if statistics is not None and not rebuild and os.path.isfile('history.csv') and \
+                statistics.continues({years: year_digest(enrollments) for years, enrollments in per_year.items()},
+                                     renames) and \
+                (export is None or export.has_years(statistics.years)):
+            mode = 'a'
+        else:
+            mode = 'w'
+            statistics = HistoryStatistics(self.ids if statistics is None else statistics.ids)
+            statistics.renames = renames
+            if export is not None:
+                export.clear()
+
+        with open('history.csv', mode, encoding='utf-8-sig') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=HISTORY_COLUMNS, delimiter=';')
+
+            if mode == 'w':
+                writer.writeheader()
+            for years, enrollments in per_year.items():
+                if years not in statistics.years:
+                    rows = statistics.add_year(years, enrollments)
+                    writer.writerows(rows)
+                    if export is not None:
+                        export.add_year(years, rows)
+
+        statistics.write()
+        if statistics_file is not None:
+            statistics.save(statistics_file)
+
+
+# rename old courses to new names (if known), shared by everything in this
+# process so each name is only normalized once
+normalizer = DepartmentNormalizer()
+
+
+def history_cache(path: str, refresh=False) -> HistoryCache:
+    # the cached enrollments contain renamed departments
+    return HistoryCache(path, refresh, normalizer.renames)
+
+
+def read_history(base_path: str,
+                 all_history=None,
+                 cache: Optional[HistoryCache] = None,
+                 workers=HISTORY_WORKERS,
+                 timings: Optional[Dict[str, float]] = None) -> EnrollmentCollection:
+    """
+    Reads the assignments of all the previous years, the year files are
+    read concurrently. The time spent per file is stored in `timings`.
+    """
+    if all_history is None:
+        all_history: List[Enrollment] = []
 
-    def __get_id(self, email):
-        try:
-            return self.ids[email]
-        except KeyError:
-            new_id = len(self.ids) + 1
-            self.ids[email] = new_id
-            return new_id
+    def load(year_file: Tuple[str, str]) -> Tuple[List[Enrollment], float]:
+        start = time.perf_counter()
+        year_history = read_history_year(*year_file, cache)
+        return year_history, time.perf_counter() - start
 
-    def to_csv(self):
-        self.items.sort(key=lambda enrollment: enrollment.years[0])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        year_files = list_history_years(base_path, executor)
+        for (_, filepath), (year_history, duration) in zip(year_files, executor.map(load, year_files)):
+            all_history.extend(year_history)
+            if timings is not None:
+                timings[filepath] = duration
 
-        participant_count: Dict[int, int] = {}
+    if cache is not None:
+        cache.save()
 
-        with open('history.csv', 'w', encoding='utf-8-sig') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=[
-                                    'id', 'count', HISTORY_HOW_MANY, HISTORY_YEARS, ENROLLMENT_DEPT, ASSIGNED_CHOICE], delimiter=';')
+    return EnrollmentCollection(all_history)
 
-            writer.writeheader()
-            for enrollment in self.items:
-                participant_id = self.__get_id(enrollment.email)
-                try:
-                    how_many = participant_count[participant_id] + 1
-                except KeyError:
-                    participant_count[participant_id] = 0
-                    how_many = 1
-                participant_count[participant_id] += 1
-                writer.writerow({
-                    'id': participant_id,
-                    'count': 1,  # makes pivot tables easier to create
-                    HISTORY_HOW_MANY: how_many,
-                    HISTORY_YEARS: f'{enrollment.years[0]}-{enrollment.years[1]}',
-                    ENROLLMENT_DEPT: enrollment.from_dept,
-                    ASSIGNED_CHOICE: enrollment.assigned_dept
-                })
-
-        # new participants each year
-        per_year: Dict[str, List[int]] = {}
-        per_year_enrollment: Dict[str, List[Enrollment]] = {}
 
-        for enrollment in self.items:
-            years = f'{enrollment.years[0]}-{enrollment.years[1]}'
-            participant_id = self.__get_id(enrollment.email)
-            try:
-                per_year[years].append(participant_id)
-                per_year_enrollment[years].append(enrollment)
-            except KeyError:
-                per_year[years] = [participant_id]
-                per_year_enrollment[years] = [enrollment]
-
-        all_previous_years = list(per_year.keys())[:-1]
-        with open('history_new_participants.csv', 'w', encoding='utf-8-sig') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=[
-                                    HISTORY_YEARS] + all_previous_years + ['completely_new'], delimiter=';')
-
-            writer.writeheader()
-            previous_years: List[str] = []
-            for years, participants in per_year.items():
-                new_count = 0
-                prev_years_counts = dict.fromkeys(all_previous_years, 0)
-                for p in participants:
-                    for prev_years in previous_years:
-                        if p in per_year[prev_years]:
-                            prev_years_counts[prev_years] += 1
-                            break
-                    else:
-                        new_count += 1
-
-                writer.writerow({
-                    HISTORY_YEARS: years,
-                    **prev_years_counts,
-                    'completely_new': new_count
-                })
-
-                previous_years.insert(0, years)
-
-        # how many times do people participate over the years?
-        histogram: Dict[int, int] = {}
-        for participant_id, participant_count in participant_count.items():
-            try:
-                histogram[participant_count] += 1
-            except KeyError:
-                histogram[participant_count] = 1
-
-        with open('history_histogram.csv', 'w', encoding='utf-8-sig') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=[
-                                    'times', 'count'], delimiter=';')
-
-            writer.writeheader()
-            for times, count in histogram.items():
-                writer.writerow({
-                    'times': times,
-                    'count': count
-                })
-
-        # how many different departments participated?
-        with open('history_depts_histogram.csv', 'w', encoding='utf-8-sig') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=[
-                                    HISTORY_YEARS, 'assigned_depts', 'from_depts'], delimiter=';')
-
-            writer.writeheader()
-            for years, enrollments in per_year_enrollment.items():
-                assigned_depts = set()
-                from_depts = set()
-                for e in enrollments:
-                    assigned_depts.add(e.assigned_dept)
-                    from_depts.add(e.from_dept)
-
-                writer.writerow({
-                    HISTORY_YEARS: years,
-                    'assigned_depts': len(assigned_depts),
-                    'from_depts': len(from_depts)
-                })
-
-
-# rename old courses to new names (if known)
-renames: Dict[str, str] = {}
-with open("renames.csv", mode="r", encoding="utf-8-sig") as csv_file:
-    csv_reader = csv.DictReader(csv_file, delimiter=';')
-
-    for row in csv_reader:
-        old = row['old'].lower().strip()
-        new = row['new'].strip()
-        renames[old] = new
-        renames[new.lower()] = new
-
-
-def read_history(base_path: str, all_history=None) -> EnrollmentCollection:
-    if all_history is None:
-        all_history: List[Enrollment] = []
+def list_history_years(base_path: str, executor: Executor) -> List[Tuple[str, str]]:
+    """
+    Lists the directory name and assignment file of each year, including
+    those in (nested) archive directories. Ordered by year.
+    """
+    year_files: List[Tuple[str, str]] = []
+    directories = [base_path]
+    while directories:
+        archives = []
+        for path, entries in zip(directories, executor.map(os.listdir, directories)):
+            for dir in entries:
+                if dir.lower().startswith('wisselwerking'):
+                    year_files.append((dir, os.path.join(path, dir, "toewijzingen.csv")))
+                elif dir.lower().startswith('archief'):
+                    archives.append(os.path.join(path, dir))
+        directories = archives
 
-    for dir in os.listdir(base_path):
-        if dir.lower().startswith('wisselwerking'):
-            year_history = read_history_year(
-                dir, os.path.join(base_path, dir, "toewijzingen.csv"))
+    year_files.sort(key=lambda year_file: (read_years(year_file[0]), year_file[1]))
+    return year_files
 
-            for enrollment in year_history:
-                all_history.append(enrollment)
-        elif dir.lower().startswith('archief'):
-            read_history(os.path.join(base_path, dir), all_history)
 
-    return EnrollmentCollection(all_history)
+def show_timings(timings: Dict[str, float]):
+    print("""
+    INLEESTIJD PER JAAR:
+    """)
+    for filepath, duration in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"{duration:7.3f}s {filepath}")
 
 
 def rename_dept(department: str) -> str:
-    department = department.replace('\u2013', '-')
-    department = re.sub(r'\s+', ' ', department)
-    department = department.strip()
-    try:
-        return renames[department.lower()]
-    except KeyError:
-        return department
+    return normalizer(department)
 
 
-def read_history_year(dir: str, filepath: str) -> List[Enrollment]:
+def read_years(dir: str) -> List[int]:
+    return list(map(lambda x: int(x), re.findall(r'\d{4}', dir)))
+
+
+def read_history_year(dir: str, filepath: str, cache: Optional[HistoryCache] = None) -> List[Enrollment]:
     if not os.path.isfile(filepath):
         print(f"{dir} overgeslagen")
         return []
 
+    if cache is not None:
+        history = cache.get(filepath)
+        if history is not None:
+            return history
+
     history: List[Enrollment] = []
-    years = list(map(lambda x: int(x), re.findall(r'\d{4}', dir)))
+    years = shared_years(read_years(dir))
     with open(filepath, mode="r", encoding="utf-8-sig") as csv_file:
         csv_reader = csv.DictReader(csv_file, delimiter=';')
 
@@ -214,4 +271,7 @@ def read_history_year(dir: str, filepath: str) -> List[Enrollment]:
                 assigned
             ))
 
+    if cache is not None:
+        cache.put(filepath, history)
+
     return history
@@ -0,0 +1,234 @@
+import csv
+import hashlib
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from queue import Empty, Queue
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .output import mail_template, organizer_letters
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_MAIL, MAIL_SUBJECT, MAIL_WORKERS, ORGANIZER_CHOICE, \
+    ORGANIZER_MAIL, ORGANIZER_SUBJECT
+
+CHECKPOINT_COLUMNS = ['sleutel', 'ontvanger', 'verzonden']
+
+
+class Mail:
+    __slots__ = ['recipients', 'subject', 'body', 'key']
+
+    def __init__(self, recipients: List[str], subject: str, body: str):
+        self.recipients = recipients
+        self.subject = subject
+        self.body = body
+        # the same mail to the same recipients has the same key: a changed
+        # mail (e.g. another assignment) is sent again
+        self.key = hashlib.sha256('\n'.join([', '.join(recipients), subject, body]).encode('utf-8')).hexdigest()
+
+    def message(self, sender: str) -> EmailMessage:
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = ', '.join(self.recipients)
+        message['Subject'] = self.subject
+        message.set_content(self.body)
+        return message
+
+
+def read_assignments(path: str) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Reads the assignments from toewijzingen.csv
+    """
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        return [(row, row[ASSIGNED_CHOICE]) for row in csv.DictReader(csv_file, delimiter=';')]
+
+
+def read_organizers(path: str) -> Dict[str, List[str]]:
+    """
+    Reads the mail addresses of the organizer(s) of each choice, a choice
+    can be listed multiple times.
+    """
+    organizers: Dict[str, List[str]] = {}
+    if not os.path.exists(path):
+        return organizers
+
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        for row in csv.DictReader(csv_file, delimiter=';'):
+            mail = (row[ORGANIZER_MAIL] or '').strip()
+            if mail:
+                organizers.setdefault(row[ORGANIZER_CHOICE].strip(), []).append(mail)
+
+    return organizers
+
+
+def participant_mails(assignments: Iterable[Tuple[Mapping[str, str], str]]) -> List[Mail]:
+    return [Mail([row[ENROLLMENT_MAIL].strip()], MAIL_SUBJECT, mail_template(assigned, row))
+            for row, assigned in assignments]
+
+
+def organizer_mails(assignments: List[Tuple[Mapping[str, str], str]],
+                    organizers: Dict[str, List[str]]) -> Tuple[List[Mail], List[str]]:
+    """
+    Renders the letters to the organizers, also for choices without any
+    assignments. Returns these and the assigned choices of which the
+    organizers are not known.
+    """
+    counter = dict.fromkeys(organizers, 0)
+    for _, assigned in assignments:
+        counter[assigned] = counter.get(assigned, 0) + 1
+
+    mails = []
+    unknown = []
+    for choice, letter in organizer_letters(assignments, counter).items():
+        if choice in organizers:
+            mails.append(Mail(organizers[choice], ORGANIZER_SUBJECT.format(choice=choice), letter))
+        else:
+            unknown.append(choice)
+    return mails, unknown
+
+
+class MailCheckpoint:
+    """
+    Keeps track of the mails which were sent: every sent mail is appended
+    (and flushed) right away, so an interrupted run can simply be started
+    again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sent: Set[str] = set()
+        self.__lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+                self.sent = set(row[CHECKPOINT_COLUMNS[0]] for row in csv.DictReader(csv_file, delimiter=';'))
+
+    def __contains__(self, mail: Mail) -> bool:
+        return mail.key in self.sent
+
+    def add(self, mail: Mail):
+        with self.__lock:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, mode="a", encoding="utf-8-sig" if new_file else "utf-8", newline="") as csv_file:
+                writer = csv.writer(csv_file, delimiter=';')
+                if new_file:
+                    writer.writerow(CHECKPOINT_COLUMNS)
+                writer.writerow([mail.key, ', '.join(mail.recipients), time.strftime('%Y-%m-%dT%H:%M:%S')])
+                csv_file.flush()
+                os.fsync(csv_file.fileno())
+            self.sent.add(mail.key)
+
+
+class RateLimit:
+    """
+    Spreads the mails evenly: at most `per_second` mails per second over
+    all the connections together.
+    """
+
+    def __init__(self, per_second: Optional[float]):
+        self.interval = 1 / per_second if per_second else 0
+        self.next = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            slot = max(self.next, now)
+            self.next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SmtpSettings:
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 sender: str,
+                 starttls=False,
+                 user: Optional[str] = None,
+                 password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.starttls = starttls
+        self.user = user
+        self.password = password
+
+    def connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port)
+        if self.starttls:
+            connection.starttls()
+        if self.user:
+            connection.login(self.user, self.password or '')
+        return connection
+
+
+def send_mails(mails: List[Mail],
+               smtp: SmtpSettings,
+               checkpoint: MailCheckpoint,
+               workers=MAIL_WORKERS,
+               per_second: Optional[float] = None,
+               progress: Optional[Callable[[Mail, Optional[Exception]], None]] = None) -> Tuple[int, int, int]:
+    """
+    Sends the mails which weren't sent yet. Each worker keeps its own
+    connection open and sends one mail after the other over it.
+
+    Returns the number of sent, skipped (sent before) and failed mails.
+    """
+    pending: Queue = Queue()
+    skipped = 0
+    for mail in mails:
+        if mail in checkpoint:
+            skipped += 1
+        else:
+            pending.put(mail)
+
+    rate_limit = RateLimit(per_second)
+    lock = threading.Lock()
+    counts = {'sent': 0, 'failed': 0}
+
+    def report(mail: Mail, error: Optional[Exception]):
+        with lock:
+            counts['failed' if error else 'sent'] += 1
+            if progress is not None:
+                progress(mail, error)
+
+    def work():
+        connection: Optional[smtplib.SMTP] = None
+        try:
+            while True:
+                try:
+                    mail = pending.get_nowait()
+                except Empty:
+                    return
+                rate_limit.wait()
+                message = mail.message(smtp.sender)
+                try:
+                    try:
+                        if connection is None:
+                            connection = smtp.connect()
+                        connection.send_message(message)
+                    except smtplib.SMTPServerDisconnected:
+                        # the server closed an idle connection: retry once
+                        connection = smtp.connect()
+                        connection.send_message(message)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as error:
+                    report(mail, error)
+                    continue
+                checkpoint.add(mail)
+                report(mail, None)
+        finally:
+            if connection is not None:
+                try:
+                    connection.quit()
+                except smtplib.SMTPException:
+                    pass
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # raise connection errors
+        for future in [executor.submit(work) for _ in range(max(1, min(workers, pending.qsize())))]:
+            future.result()
+
+    return counts['sent'], skipped, counts['failed']
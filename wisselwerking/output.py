@@ -0,0 +1,171 @@
+import csv
+import glob
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from .enrollments import format_name
+from .history import rename_dept
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_CHOICES, ENROLLMENT_DEPT, ENROLLMENT_MAIL, MAIL_COLUMN, \
+    OUTPUT_WORKERS, RANDOM_CHOICE, TEAM
+
+
+def output_text_file(output_file: str, choice: str, escape=True) -> str:
+    output_prepath = str.join('.', output_file.split('.')[:-1])
+    return output_prepath + '.' + (choice if not escape else re.sub(r'[\*\(\) \-\.\&\/]+', '-', choice)) + '.txt'
+
+
+def mail_template(assigned, enrollment):
+    name = format_name(enrollment)
+    first_choice = enrollment[ENROLLMENT_CHOICES[0]].strip()
+    second_choice = enrollment[ENROLLMENT_CHOICES[1]].strip()
+    third_choice = enrollment[ENROLLMENT_CHOICES[2]].strip()
+    if assigned == first_choice or first_choice == RANDOM_CHOICE:
+        # first choice
+        content = f"""Je bent geplaatst voor de Wisselwerking {assigned}. We hebben je gegevens doorgegeven aan de contactpersoon van deze Wisselwerking. Deze zal contact met opnemen om verdere afspraken te maken over je deelname.
+
+Heel veel plezier bij je wisselwerking!"""
+    elif assigned == second_choice or assigned == third_choice or \
+            RANDOM_CHOICE in [second_choice, third_choice]:
+        # second, third choice
+        if assigned == third_choice:
+            ordinal = "derde"
+        elif assigned == second_choice:
+            ordinal = "tweede"
+        else:
+            # random!
+            ordinal = "vrije"
+
+        content = f"""Helaas was bij jouw eerste keuze voor de Wisselwerking bij {first_choice} geen plek meer. Je bent nu geplaatst bij je {ordinal} keuze: {assigned}.
+
+We hebben je gegevens doorgegeven aan de contactpersoon van deze Wisselwerking. Deze zal contact met opnemen om verdere afspraken te maken over je deelname.
+
+Heel veel plezier bij je wisselwerking!"""
+    else:
+        # nothing
+        content = f"Je hebt je aangemeld voor de Wisselwerking {first_choice}. Helaas waren deze en eventuele verdere keuzes vol."
+
+    return f"""
+Beste {name},
+
+{content}
+
+Hartelijke groet,
+
+Team Wisselwerking Geesteswetenschappen
+{TEAM}
+""".strip()
+
+
+def write_assignments(output_file: str,
+                      assignments: Iterable[Tuple[Mapping[str, str], str]],
+                      form_fieldnames: List[str]):
+    with open(output_file, mode="w", encoding="utf-8-sig") as csv_file:
+        fieldnames = [ASSIGNED_CHOICE, ENROLLMENT_MAIL, MAIL_COLUMN] + \
+            [field for field in form_fieldnames if field != MAIL_COLUMN]
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=';')
+
+        writer.writeheader()
+        for (row, assigned) in assignments:
+            writer.writerow({
+                ASSIGNED_CHOICE: assigned,
+                MAIL_COLUMN: mail_template(assigned, row),
+                **row
+            })
+
+
+def organizer_letter(choice: str, count: int, participants: List[str]) -> str:
+    if count > 0:
+        return f"""Beste organisator,
+
+Leuk dat je je hebt opgegeven om een wisselwerking te organiseren! Voor de wisselwerking {choice} hebben de volgende {count} person(en) zich aangemeld:
+
+""" + str.join('', participants) + f"""
+Zou je zo snel mogelijk contact willen opnemen met deze mensen om afspraken te maken over de wisselwerking? 
+
+Heel veel plezier bij de wisselwerking!
+
+Hartelijke groet,
+
+Team Wisselwerking Geesteswetenschappen
+{TEAM}
+"""
+    else:
+        return f"""Beste organisator,
+
+Helaas heeft dit jaar niemand zich aangemeld voor de Wisselwerking {choice}.
+
+Dank dat je een Wisselwerking wilde organiseren. We hopen dat je volgend jaar weer meedoet!
+
+Hartelijke groet,
+
+Team Wisselwerking Geesteswetenschappen
+{TEAM}
+"""
+
+
+def organizer_letters(assignments: Iterable[Tuple[Mapping[str, str], str]],
+                      counter: Dict[str, int]) -> Dict[str, str]:
+    """
+    Renders the letter to the organizer(s) of each choice
+    """
+    per_choice: Dict[str, List[str]] = {}
+    for (row, assigned) in assignments:
+        line = f"{format_name(row, True)} <{row[ENROLLMENT_MAIL]}> ({rename_dept(row[ENROLLMENT_DEPT])})\n"
+        try:
+            per_choice[assigned].append(line)
+        except KeyError:
+            per_choice[assigned] = [line]
+
+    return {
+        choice: organizer_letter(choice, counter[choice], per_choice.get(choice, []))
+        for choice in sorted(counter) if choice != RANDOM_CHOICE
+    }
+
+
+def write_if_changed(target: str, content: str) -> bool:
+    """
+    Writes the content (atomically) unless the file already contains it.
+    Returns whether the file was written.
+    """
+    # same as writing in text mode
+    data = content.replace('\n', os.linesep).encode('utf-8-sig')
+    try:
+        if os.path.getsize(target) == len(data):
+            with open(target, mode="rb") as existing:
+                if hashlib.sha256(existing.read()).digest() == hashlib.sha256(data).digest():
+                    return False
+    except OSError:
+        pass
+
+    temp_path = target + '.tmp'
+    with open(temp_path, mode="wb") as txt_file:
+        txt_file.write(data)
+    os.replace(temp_path, target)
+    return True
+
+
+def write_organizer_files(output_file: str,
+                          assignments: Iterable[Tuple[Mapping[str, str], str]],
+                          counter: Dict[str, int],
+                          workers=OUTPUT_WORKERS) -> Tuple[int, int, int]:
+    """
+    Stores the assignments per choice - to mail the organizers. Files of
+    choices which are no longer assigned are removed.
+
+    Returns the number of written, unchanged and removed files.
+    """
+    existing_files = set(glob.glob(output_text_file(output_file, '*', False)))
+    targets = {
+        output_text_file(output_file, choice): letter
+        for choice, letter in organizer_letters(assignments, counter).items()
+    }
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        written = sum(executor.map(lambda target: write_if_changed(target, targets[target]), targets))
+        # clear existing files, which are no longer assigned
+        removed = list(executor.map(os.remove, existing_files - set(targets)))
+
+    return written, len(targets) - written, len(removed)
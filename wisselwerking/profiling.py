@@ -0,0 +1,160 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+PROFILERS = ['cprofile', 'tracemalloc']
+
+# number of functions or allocation sites in the report
+PROFILE_TOP = 25
+
+
+class Phase:
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'name': self.name,
+            'seconds': round(self.seconds, 6),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / self.seconds) if self.rows and self.seconds else None
+        }
+
+
+class RunProfile:
+    """
+    Keeps the wall-clock time and number of rows of each phase of a run,
+    the hit rates of the caches and the (peak) memory use. Optionally the
+    whole run is profiled using cProfile or tracemalloc.
+    """
+
+    def __init__(self, profiler: Optional[str] = None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.profiler = profiler
+        self.phases: List[Phase] = []
+        self.caches: Dict[str, Dict[str, object]] = {}
+        self.started = time.time()
+        self.__start = time.perf_counter()
+        self.__profile: Optional[cProfile.Profile] = None
+
+    def start(self):
+        self.started = time.time()
+        self.__start = time.perf_counter()
+        if self.profiler == 'cprofile':
+            self.__profile = cProfile.Profile()
+            self.__profile.enable()
+        elif self.profiler == 'tracemalloc':
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        """
+        Measures the enclosed code, the number of rows can be set on the
+        returned phase.
+        """
+        phase = Phase(name)
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            self.phases.append(phase)
+
+    def cache(self, name: str, hits: int, misses: int):
+        lookups = hits + misses
+        self.caches[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None
+        }
+
+    def report(self, dump_path: Optional[str] = None) -> Dict[str, object]:
+        """
+        Stops the profiler (if any) and returns the report. The cProfile
+        statistics are dumped to `dump_path`, which can be read by pstats.
+        """
+        total = time.perf_counter() - self.__start
+        report: Dict[str, object] = {
+            'command': sys.argv,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total_seconds': round(total, 6),
+            'phases': [phase.to_dict() for phase in self.phases],
+            'caches': self.caches,
+            'memory': {}
+        }
+
+        if resource is not None:
+            # kilobytes on Linux, bytes on macOS
+            report['memory']['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if self.__profile is not None:
+            self.__profile.disable()
+            if dump_path is not None:
+                self.__profile.dump_stats(dump_path)
+                report['cprofile_file'] = dump_path
+            output = io.StringIO()
+            stats = pstats.Stats(self.__profile, stream=output)
+            stats.sort_stats('cumulative')
+            report['cprofile'] = [
+                {
+                    'function': f"{filename}:{line}({function})",
+                    'calls': calls,
+                    'total_seconds': round(total_time, 6),
+                    'cumulative_seconds': round(cumulative_time, 6)
+                }
+                for (filename, line, function), (_, calls, total_time, cumulative_time, _)
+                in sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            ]
+            self.__profile = None
+        elif self.profiler == 'tracemalloc' and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report['memory']['traced_current_bytes'] = current
+            report['memory']['traced_peak_bytes'] = peak
+            report['tracemalloc'] = [
+                {
+                    'location': str(statistic.traceback),
+                    'bytes': statistic.size,
+                    'blocks': statistic.count
+                }
+                for statistic in snapshot.statistics('lineno')[:PROFILE_TOP]
+            ]
+
+        return report
+
+    def write(self, path: str, dump_path: Optional[str] = None) -> Dict[str, object]:
+        report = self.report(dump_path)
+        with open(path, mode="w", encoding="utf-8") as json_file:
+            json.dump(report, json_file, indent=2)
+        return report
+
+
+def show_profile(report: Dict[str, object]):
+    print("""
+    PROFIEL:
+    """)
+    for phase in report['phases']:
+        rows = f" {phase['rows']} rijen" if phase['rows'] is not None else ""
+        print(f"{phase['seconds']:9.3f}s {phase['name']}{rows}")
+    print(f"{report['total_seconds']:9.3f}s totaal")
+    for name, cache in report['caches'].items():
+        if cache['hit_rate'] is not None:
+            print(f"cache {name}: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%})")
+    for name, value in report['memory'].items():
+        print(f"geheugen {name}: {value}")
@@ -0,0 +1,199 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .assign import SOLVERS, MissingCapacities, assign, chosen
+from .capacities import read_capacities
+from .enrollments import read_enrollments
+from .history import EnrollmentCollection, history_cache, list_history_years, normalizer, read_history
+from .output import write_assignments
+from .settings import history_cache_file, ENROLLMENT_CHOICES, ENROLLMENT_MAIL, ENROLLMENT_SOURCE, HISTORY_WORKERS, \
+    SERVICE_CHECK_INTERVAL
+from .statistics import HistoryStatistics
+
+
+class HistoryService:
+    """
+    Keeps the history of the previous years (and its statistics) in memory
+    for all the requests. The year files and the renames are checked at
+    most every `check_interval` seconds: when any of these changed the
+    history is read again, which only parses the changed files (the others
+    come from the cache).
+    """
+
+    def __init__(self, base_path: str, workers=HISTORY_WORKERS, check_interval=SERVICE_CHECK_INTERVAL):
+        self.base_path = base_path
+        self.workers = workers
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.history: Optional[EnrollmentCollection] = None
+        self.fingerprint: Optional[Tuple] = None
+        self.loaded: Optional[float] = None
+        self.loads = 0
+        self.__checked = 0.0
+        self.__statistics: Optional[HistoryStatistics] = None
+
+    def current_fingerprint(self) -> Tuple:
+        def stat(path: str) -> Tuple[str, Optional[int], Optional[int]]:
+            try:
+                result = os.stat(path)
+                return path, result.st_mtime_ns, result.st_size
+            except FileNotFoundError:
+                return path, None, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            year_files = list_history_years(self.base_path, executor)
+            return (stat(normalizer.path),) + tuple(executor.map(stat, (path for _, path in year_files)))
+
+    def get(self) -> EnrollmentCollection:
+        with self.lock:
+            now = time.monotonic()
+            if self.history is not None and now - self.__checked < self.check_interval:
+                return self.history
+            self.__checked = now
+
+            fingerprint = self.current_fingerprint()
+            if fingerprint != self.fingerprint:
+                if self.fingerprint is not None and fingerprint[0] != self.fingerprint[0]:
+                    normalizer.reload()
+                self.history = read_history(self.base_path,
+                                            cache=history_cache(history_cache_file),
+                                            workers=self.workers)
+                self.__statistics = None
+                self.fingerprint = fingerprint
+                self.loaded = time.time()
+                self.loads += 1
+            return self.history
+
+    def statistics(self) -> HistoryStatistics:
+        history = self.get()
+        with self.lock:
+            if self.__statistics is None:
+                self.__statistics = history.statistics()
+            return self.__statistics
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    GET  /status                  what is loaded
+    GET  /history?email=...       previous participations of a participant
+    GET  /statistics              statistics of the previous years
+    POST /assign?solver=greedy    assigns the uploaded form export (CSV),
+                                  add format=csv to get toewijzingen.csv
+    """
+    service: HistoryService
+    capacity_file: str
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/status':
+            history = self.service.get()
+            self.send_json({
+                'previous_years_dir': self.service.base_path,
+                'enrollments': len(history),
+                'year_files': len(self.service.fingerprint) - 1,
+                'loaded': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.service.loaded)),
+                'loads': self.service.loads
+            })
+        elif url.path == '/history':
+            email = query.get('email', [''])[0].lower().strip()
+            if not email:
+                self.send_error(HTTPStatus.BAD_REQUEST, "email is required")
+                return
+            self.send_json([{
+                'years': f'{enrollment.years[0]}-{enrollment.years[1]}',
+                'from_dept': enrollment.from_dept,
+                'assigned_dept': enrollment.assigned_dept
+            } for enrollment in self.service.get().by_email(email)])
+        elif url.path == '/statistics':
+            statistics = self.service.statistics()
+            self.send_json({
+                'years': statistics.years,
+                'histogram': [{'times': times, 'count': count} for times, count in statistics.histogram_rows()],
+                'depts': {years: {'assigned_depts': assigned, 'from_depts': from_depts}
+                          for years, (assigned, from_depts) in statistics.depts.items()},
+                'new_participants': {years: {'completely_new' if previous is None else previous: count
+                                             for previous, count in counts.items()}
+                                     for years, counts in statistics.new_participants.items()}
+            })
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path != '/assign':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        solver = query.get('solver', ['greedy'])[0]
+        if solver not in SOLVERS:
+            self.send_error(HTTPStatus.BAD_REQUEST, f"solver should be one of {', '.join(sorted(SOLVERS))}")
+            return
+
+        history = self.service.get()
+        with tempfile.TemporaryDirectory() as workdir:
+            export_path = os.path.join(workdir, 'export.csv')
+            with open(export_path, mode="wb") as export_file:
+                export_file.write(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            try:
+                enrollments, form_fieldnames = read_enrollments(export_path)
+            except (StopIteration, KeyError) as error:
+                self.send_error(HTTPStatus.BAD_REQUEST, f"not a form export: {error}")
+                return
+            missing = [column for column in [ENROLLMENT_SOURCE, ENROLLMENT_MAIL] + ENROLLMENT_CHOICES
+                       if column not in form_fieldnames]
+            if missing:
+                self.send_error(HTTPStatus.BAD_REQUEST, f"not a form export, missing: {', '.join(missing)}")
+                return
+            if any(not (enrollment[ENROLLMENT_MAIL] or '').strip() for enrollment in enrollments):
+                self.send_error(HTTPStatus.BAD_REQUEST, f"enrollment without {ENROLLMENT_MAIL}")
+                return
+
+            try:
+                result = assign(enrollments, read_capacities(self.capacity_file), history, solver=solver)
+            except MissingCapacities as error:
+                self.send_json({'missing_capacities': error.choices}, HTTPStatus.CONFLICT)
+                return
+
+            if query.get('format', [''])[0] == 'csv':
+                output_path = os.path.join(workdir, 'toewijzingen.csv')
+                write_assignments(output_path, result.assignments, form_fieldnames)
+                with open(output_path, mode="rb") as output_file:
+                    self.send_body(output_file.read(), 'text/csv; charset=utf-8')
+                return
+
+        self.send_json({
+            'assignments': [{
+                'email': enrollment[ENROLLMENT_MAIL],
+                'assigned': assigned,
+                'rank': chosen(enrollment).index(assigned) + 1 if assigned in chosen(enrollment) else None
+            } for enrollment, assigned in result.assignments],
+            'unassigned': [enrollment[ENROLLMENT_MAIL] for enrollment in result.unassigned],
+            'counts': result.counter,
+            'ranks': result.ranks()
+        })
+
+    def send_json(self, content: object, status=HTTPStatus.OK):
+        self.send_body(json.dumps(content, ensure_ascii=False, indent=2).encode('utf-8'),
+                       'application/json; charset=utf-8',
+                       status)
+
+    def send_body(self, body: bytes, content_type: str, status=HTTPStatus.OK):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(service: HistoryService, host: str, port: int, capacity_file: str) -> ThreadingHTTPServer:
+    handler = type('Handler', (ServiceHandler,), {'service': service, 'capacity_file': capacity_file})
+    return ThreadingHTTPServer((host, port), handler)
@@ -1,5 +1,18 @@
 capacity_file = "capacities.csv"
 output_file = "toewijzingen.csv"
+history_cache_file = "history.cache"
+history_statistics_file = "history.statistics"
+history_db_file = "history.sqlite"
+history_export_dir = "history_export"
+history_flows_file = "history_flows.csv"
+history_flows_matrix_file = "history_flows.npz"
+history_never_exchanged_file = "history_never_exchanged.csv"
+renames_file = "renames.csv"
+simulation_file = "simulatie.csv"
+profile_file = "profile.json"
+profile_stats_file = "profile.prof"
+organizers_file = "organisatoren.csv"
+mail_checkpoint_file = "verzonden.csv"
 
 ASSIGNED_CHOICE = "toegewezen"
 
@@ -8,6 +21,13 @@ CAPACITY_VALUE = "aantal"
 
 TEAM = "Desiree Capel, Nicoline Fokkema, Yvonne de Jong en Sheean Spoel"
 MAIL_COLUMN = "mail"
+MAIL_SUBJECT = "Wisselwerking Geesteswetenschappen"
+ORGANIZER_SUBJECT = "Aanmeldingen voor de Wisselwerking {choice}"
+# number of SMTP connections which are used at the same time
+MAIL_WORKERS = 2
+
+ORGANIZER_CHOICE = "keuze"
+ORGANIZER_MAIL = "e_mailadres"
 
 ENROLLMENT_SOURCE = "_fd_Source"
 ENROLLMENT_FIRSTNAME = "voornaam"
@@ -18,6 +38,20 @@ ENROLLMENT_CHOICES = ["eerste_keuze", "tweede_keuze", "derde_keuze"]
 
 HISTORY_YEARS = 'jaren'
 HISTORY_HOW_MANY = 'hoeveelste_keer'
+# number of year files which are read at the same time
+HISTORY_WORKERS = 8
+# number of files which are written at the same time
+OUTPUT_WORKERS = 8
+# seconds between checking the year files for changes in serve.py
+SERVICE_CHECK_INTERVAL = 30
+SERVICE_PORT = 8765
+# seconds between checking the form export in --watch mode
+WATCH_INTERVAL = 5
+# seconds without new enrollments before the output is written
+WATCH_DEBOUNCE = 10
+
+# minimal similarity of possibly duplicate participants
+DUPLICATE_THRESHOLD = 0.9
 
 RANDOM_CHOICE = "» Verras me"
 NONE_CHOICE = ["Maak je keuze", "", "--", "---"]
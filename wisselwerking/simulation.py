@@ -0,0 +1,201 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .assign import RANDOM_CAPACITY
+from .capacities import missing_capacities
+from .settings import ENROLLMENT_CHOICES, NONE_CHOICE, RANDOM_CHOICE
+
+# marks a choice which isn't chosen by an enrollment
+NOT_CHOSEN = len(ENROLLMENT_CHOICES)
+# the placements which are counted per choice: by rank and unassigned
+PLACEMENTS = [f"{rank + 1}e keuze" for rank in range(len(ENROLLMENT_CHOICES))] + ["zonder toewijzing"]
+
+
+def encode_enrollments(enrollments: List[Mapping[str, str]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Encodes the choices of the enrollments (first enrollment first) as the
+    sorted list of choices and an array with the (best) rank at which each
+    enrollment chose each choice, or NOT_CHOSEN.
+    """
+    per_enrollment: List[List[Optional[str]]] = []
+    names = set()
+    for enrollment in enrollments:
+        chosen = []
+        for key in ENROLLMENT_CHOICES:
+            choice = enrollment[key]
+            if not choice or choice.strip() in NONE_CHOICE:
+                chosen.append(None)
+            else:
+                chosen.append(choice.strip())
+                names.add(choice.strip())
+        per_enrollment.append(chosen)
+
+    choices = sorted(names)
+    index = {choice: j for j, choice in enumerate(choices)}
+    ranks = np.full((len(choices), len(enrollments)), NOT_CHOSEN, dtype=np.int8)
+    for e, chosen in enumerate(per_enrollment):
+        # iterate backwards: a choice listed twice counts at its best rank
+        for rank in reversed(range(len(chosen))):
+            if chosen[rank] is not None:
+                ranks[index[chosen[rank]], e] = rank
+
+    return choices, ranks
+
+
+def round_robin_batch(ranks: np.ndarray, capacities: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    The same rules as assign.round_robin, applied to a batch of scenarios at
+    once: each iteration every open choice gets the unassigned enrollment
+    with the best rank and within that the earliest position.
+
+    `capacities` has a row of capacities per scenario and `positions` the
+    position of each enrollment per scenario. Returns the assigned choice
+    per scenario and enrollment, or -1.
+    """
+    scenarios, n = positions.shape
+    m = ranks.shape[0]
+    scenario_range = np.arange(scenarios)
+    assigned = np.full((scenarios, n), -1, dtype=np.int32)
+    counter = np.zeros((scenarios, m), dtype=np.int32)
+    is_open = capacities > 0
+    # choices which nobody wants never get an iteration
+    is_open[:, ~(ranks < NOT_CHOSEN).any(axis=1)] = False
+    # combined key of rank and position, the lowest is served first
+    no_candidate = NOT_CHOSEN * n
+
+    while is_open.any():
+        for j in range(m):
+            active = is_open[:, j]
+            if not active.any():
+                continue
+            chosen = ranks[j] < NOT_CHOSEN
+            keys = np.where(chosen & (assigned < 0), ranks[j].astype(np.int64) * n + positions, no_candidate)
+            best = keys.argmin(axis=1)
+            found = active & (keys[scenario_range, best] < no_candidate)
+
+            # exhausted: nobody left who wants this choice
+            is_open[active & ~found, j] = False
+
+            assigned[scenario_range[found], best[found]] = j
+            counter[found, j] += 1
+            is_open[found & (counter[:, j] >= capacities[:, j]), j] = False
+
+    return assigned
+
+
+def count_placements(ranks: np.ndarray, assigned: np.ndarray) -> np.ndarray:
+    """
+    Per scenario and choice the number of enrollments placed at each rank,
+    the unassigned enrollments are counted at their first choice.
+    """
+    scenarios, n = assigned.shape
+    m = ranks.shape[0]
+    counts = np.zeros((scenarios, m, len(PLACEMENTS)), dtype=np.int32)
+    enrollment_range = np.arange(n)
+    first_choice = np.argmin(ranks, axis=0)
+    has_first = ranks[first_choice, enrollment_range] == 0
+
+    for s in range(scenarios):
+        placed = assigned[s] >= 0
+        choice = assigned[s][placed]
+        rank = ranks[choice, enrollment_range[placed]]
+        np.add.at(counts[s], (choice, rank), 1)
+
+        unassigned = ~placed & has_first
+        np.add.at(counts[s], (first_choice[unassigned], len(PLACEMENTS) - 1), 1)
+
+    return counts
+
+
+def simulate_batch(ranks: np.ndarray,
+                   capacities: np.ndarray,
+                   scenarios: int,
+                   spread: int,
+                   shuffle: bool,
+                   seed: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = ranks.shape[1]
+    batch_capacities = np.tile(capacities, (scenarios, 1))
+    if spread:
+        # only open (and limited) choices are perturbed
+        perturbed = (capacities > 0) & (capacities < RANDOM_CAPACITY)
+        noise = rng.integers(-spread, spread + 1, size=batch_capacities.shape)
+        batch_capacities = np.where(perturbed, np.maximum(batch_capacities + noise, 0), batch_capacities)
+    if shuffle:
+        positions = np.argsort(rng.random((scenarios, n)), axis=1)
+    else:
+        positions = np.tile(np.arange(n), (scenarios, 1))
+
+    return count_placements(ranks, round_robin_batch(ranks, batch_capacities, positions))
+
+
+def simulate(enrollments: List[Mapping[str, str]],
+             capacities: Dict[str, Optional[int]],
+             scenarios=1000,
+             spread=0,
+             shuffle=False,
+             seed: Optional[int] = None,
+             workers: Optional[int] = None,
+             batch_size=100) -> Tuple[List[str], np.ndarray]:
+    """
+    Runs what-if scenarios of the (greedy) assignment: with capacities
+    randomly changed by at most `spread` places and/or with the order of
+    enrollment shuffled. The scenarios are run in batches in a process pool.
+
+    Returns the choices and the placement counts per scenario, choice and
+    placement (see PLACEMENTS).
+    """
+    choices, ranks = encode_enrollments(enrollments)
+    missing = missing_capacities({choice: capacities.get(choice) for choice in choices}, choices)
+    if missing:
+        raise ValueError("Capacity unknown for: " + ", ".join(missing))
+    base = np.array([RANDOM_CAPACITY if choice == RANDOM_CHOICE else capacities[choice] for choice in choices],
+                    dtype=np.int32)
+
+    sizes = [batch_size] * (scenarios // batch_size)
+    if scenarios % batch_size:
+        sizes.append(scenarios % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = list(executor.map(simulate_batch,
+                                    [ranks] * len(sizes),
+                                    [base] * len(sizes),
+                                    sizes,
+                                    [spread] * len(sizes),
+                                    [shuffle] * len(sizes),
+                                    seeds))
+
+    return choices, np.concatenate(batches)
+
+
+def summarize(choices: List[str], counts: np.ndarray) -> List[Dict[str, object]]:
+    """
+    The distribution (mean and 5th, 50th and 95th percentile) of each
+    placement per choice
+    """
+    rows = []
+    for j, choice in enumerate(choices):
+        for p, placement in enumerate(PLACEMENTS):
+            values = counts[:, j, p]
+            low, median, high = np.percentile(values, [5, 50, 95])
+            rows.append({
+                'keuze': choice,
+                'plaatsing': placement,
+                'gemiddeld': round(float(values.mean()), 2),
+                'p5': float(low),
+                'p50': float(median),
+                'p95': float(high)
+            })
+    return rows
+
+
+def write_summary(path: str, rows: List[Dict[str, object]]):
+    with open(path, mode="w", encoding="utf-8-sig") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=['keuze', 'plaatsing', 'gemiddeld', 'p5', 'p50', 'p95'],
+                                delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,241 @@
+import csv
+import hashlib
+import heapq
+import os
+import pickle
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_DEPT, HISTORY_YEARS, HISTORY_HOW_MANY
+
+if TYPE_CHECKING:
+    from .history import Enrollment
+
+# increase when the stored state changes
+STATISTICS_VERSION = 2
+
+
+class HistoryStatistics:
+    """
+    Anonymised statistics of the previous years. These are updated one
+    year at a time (in order), so the state can be stored and a new year
+    can be added without going through all the previous years again.
+    """
+
+    def __init__(self, ids: Optional[Dict[str, int]] = None):
+        # email -> anonymous participant id, kept stable between runs
+        self.ids: Dict[str, int] = {} if ids is None else ids
+        # years -> number of enrollments
+        self.years: Dict[str, int] = {}
+        # years -> digest of its enrollments, to notice changed years
+        self.digests: Dict[str, str] = {}
+        # fingerprint of the renames of the departments in this state
+        self.renames: Optional[str] = None
+        # participant id -> number of participations
+        self.participant_count: Dict[int, int] = {}
+        # participant id -> order of first participation
+        self.participant_order: Dict[int, int] = {}
+        # participant id -> most recent years of participation
+        self.last_years: Dict[int, str] = {}
+        # years -> previous years of its participants (or None) -> count
+        self.new_participants: Dict[str, Dict[Optional[str], int]] = {}
+        # times -> number of participants and a heap of (order, participant id),
+        # entries of participants which moved to another number are removed lazily
+        self.histogram: Dict[int, int] = {}
+        self.histogram_participants: Dict[int, List[Tuple[int, int]]] = {}
+        # years -> number of distinct assigned and from departments
+        self.depts: Dict[str, Tuple[int, int]] = {}
+
+    @staticmethod
+    def load(path: str) -> Optional['HistoryStatistics']:
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, mode="rb") as state_file:
+                version, statistics = pickle.load(state_file)
+        except Exception:
+            return None
+
+        if version != STATISTICS_VERSION:
+            # the participant ids should remain stable
+            return HistoryStatistics(getattr(statistics, 'ids', None))
+
+        return statistics
+
+    def save(self, path: str):
+        temp_path = path + ".tmp"
+        with open(temp_path, mode="wb") as state_file:
+            pickle.dump((STATISTICS_VERSION, self), state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def continues(self, year_digests: Dict[str, str], renames: str) -> bool:
+        """
+        Are the years in this state the first of these years, with the same
+        enrollments and department renames?
+        """
+        years = list(year_digests.items())
+        return self.renames == renames and list(self.digests.items()) == years[:len(self.digests)]
+
+    def get_id(self, email: str) -> int:
+        try:
+            return self.ids[email]
+        except KeyError:
+            new_id = len(self.ids) + 1
+            self.ids[email] = new_id
+            return new_id
+
+    def add_year(self, years: str, enrollments: List['Enrollment']) -> List[Dict[str, object]]:
+        """
+        Adds the enrollments of a year, this should be more recent than the
+        years already added. Returns the (anonymised) rows for history.csv
+        """
+        rows = []
+        previous_years: Dict[int, Optional[str]] = {}
+        new_participants: Dict[Optional[str], int] = {}
+        assigned_depts = set()
+        from_depts = set()
+
+        for enrollment in enrollments:
+            participant_id = self.get_id(enrollment.email)
+            try:
+                previous = previous_years[participant_id]
+            except KeyError:
+                previous = self.last_years.get(participant_id)
+                previous_years[participant_id] = previous
+            new_participants[previous] = new_participants.get(previous, 0) + 1
+
+            how_many = self.participant_count.get(participant_id, 0) + 1
+            self.participant_count[participant_id] = how_many
+            order = self.participant_order.setdefault(participant_id, len(self.participant_order))
+            if how_many > 1:
+                self.histogram[how_many - 1] -= 1
+            try:
+                self.histogram[how_many] += 1
+            except KeyError:
+                self.histogram[how_many] = 1
+                self.histogram_participants[how_many] = []
+            heapq.heappush(self.histogram_participants[how_many], (order, participant_id))
+
+            assigned_depts.add(enrollment.assigned_dept)
+            from_depts.add(enrollment.from_dept)
+
+            rows.append(history_row(participant_id, how_many, years, enrollment.from_dept, enrollment.assigned_dept))
+
+        for participant_id in previous_years:
+            self.last_years[participant_id] = years
+        self.years[years] = len(enrollments)
+        self.digests[years] = year_digest(enrollments)
+        self.new_participants[years] = new_participants
+        self.depts[years] = (len(assigned_depts), len(from_depts))
+
+        return rows
+
+    def histogram_rows(self) -> List[Tuple[int, int]]:
+        """
+        How many times do people participate over the years? Ordered by the
+        first participant with that number of participations.
+        """
+        first: Dict[int, int] = {}
+        for times, count in self.histogram.items():
+            if not count:
+                continue
+            participants = self.histogram_participants[times]
+            while self.participant_count[participants[0][1]] != times:
+                heapq.heappop(participants)
+            first[times] = participants[0][0]
+
+        return [(times, self.histogram[times]) for times in sorted(first, key=first.get)]
+
+    def write(self):
+        write_new_participants(self.new_participants)
+        write_histogram(self.histogram_rows())
+        write_depts(self.depts)
+
+
+def history_row(participant_id: int,
+                how_many: int,
+                years: str,
+                from_dept: str,
+                assigned_dept: str) -> Dict[str, object]:
+    return {
+        'id': participant_id,
+        'count': 1,  # makes pivot tables easier to create
+        HISTORY_HOW_MANY: how_many,
+        HISTORY_YEARS: years,
+        ENROLLMENT_DEPT: from_dept,
+        ASSIGNED_CHOICE: assigned_dept
+    }
+
+
+def enrollment_row(enrollment: 'Enrollment') -> List[str]:
+    """
+    The email, years, from and assigned department of an enrollment
+    """
+    return [enrollment.email, f'{enrollment.years[0]}-{enrollment.years[1]}', enrollment.from_dept,
+            enrollment.assigned_dept]
+
+
+def year_digest(enrollments: List['Enrollment']) -> str:
+    digest = hashlib.sha256()
+    for enrollment in enrollments:
+        digest.update(f'{enrollment.email};{enrollment.from_dept};{enrollment.assigned_dept}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def renames_fingerprint(renames: Dict[str, str]) -> str:
+    return hashlib.sha256('\n'.join(f'{old};{new}' for old, new in sorted(renames.items())).encode('utf-8')).hexdigest()
+
+
+# the columns of history.csv
+HISTORY_COLUMNS = ['id', 'count', HISTORY_HOW_MANY, HISTORY_YEARS, ENROLLMENT_DEPT, ASSIGNED_CHOICE]
+
+
+def write_new_participants(new_participants: Dict[str, Dict[Optional[str], int]]):
+    """
+    Per years the number of participants by their previous years of
+    participation (None for completely new participants)
+    """
+    all_previous_years = list(new_participants.keys())[:-1]
+    with open('history_new_participants.csv', 'w', encoding='utf-8-sig') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=[
+                                HISTORY_YEARS] + all_previous_years + ['completely_new'], delimiter=';')
+
+        writer.writeheader()
+        for years, counts in new_participants.items():
+            prev_years_counts = dict.fromkeys(all_previous_years, 0)
+            for prev_years, count in counts.items():
+                if prev_years is not None:
+                    prev_years_counts[prev_years] = count
+            writer.writerow({
+                HISTORY_YEARS: years,
+                **prev_years_counts,
+                'completely_new': counts.get(None, 0)
+            })
+
+
+def write_histogram(histogram: List[Tuple[int, int]]):
+    with open('history_histogram.csv', 'w', encoding='utf-8-sig') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=[
+                                'times', 'count'], delimiter=';')
+
+        writer.writeheader()
+        for times, count in histogram:
+            writer.writerow({
+                'times': times,
+                'count': count
+            })
+
+
+def write_depts(depts: Dict[str, Tuple[int, int]]):
+    # how many different departments participated?
+    with open('history_depts_histogram.csv', 'w', encoding='utf-8-sig') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=[
+                                HISTORY_YEARS, 'assigned_depts', 'from_depts'], delimiter=';')
+
+        writer.writeheader()
+        for years, (assigned_depts, from_depts) in depts.items():
+            writer.writerow({
+                HISTORY_YEARS: years,
+                'assigned_depts': assigned_depts,
+                'from_depts': from_depts
+            })
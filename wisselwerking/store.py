@@ -0,0 +1,344 @@
+import csv
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .export import HistoryExport
+from .history import Enrollment, list_history_years, normalizer, read_history_year
+from .settings import HISTORY_WORKERS, HISTORY_YEARS
+from .statistics import HISTORY_COLUMNS, HistoryStatistics, enrollment_row, history_row, renames_fingerprint, \
+    write_depts, write_histogram, write_new_participants
+
+# increase when the schema changes, the database is then imported again
+STORE_VERSION = 1
+
+# number of rows per insert statement
+INSERT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS enrollments (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    seq INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    years TEXT NOT NULL,
+    from_dept TEXT NOT NULL,
+    assigned_dept TEXT NOT NULL,
+    PRIMARY KEY (file_id, seq)
+);
+CREATE INDEX IF NOT EXISTS enrollments_email ON enrollments(email);
+CREATE INDEX IF NOT EXISTS enrollments_years ON enrollments(years);
+CREATE INDEX IF NOT EXISTS enrollments_from_dept ON enrollments(from_dept);
+CREATE INDEX IF NOT EXISTS enrollments_assigned_dept ON enrollments(assigned_dept);
+CREATE TABLE IF NOT EXISTS participants (
+    email TEXT PRIMARY KEY,
+    id INTEGER NOT NULL
+);
+"""
+
+# the attributes on which the store can be queried (see INDEX_KEYS)
+COLUMNS = {
+    'email': 'email',
+    'years': 'years',
+    'from_dept': 'from_dept',
+    'assigned_dept': 'assigned_dept'
+}
+
+# in order of the history: by year file and within that by row
+SELECT_ENROLLMENTS = """
+SELECT e.email, e.years, e.from_dept, e.assigned_dept
+FROM enrollments e JOIN files f ON f.id = e.file_id
+{where}
+ORDER BY f.position, e.seq
+"""
+
+
+def encode_years(years: Tuple[int, ...]) -> str:
+    return '-'.join(str(year) for year in years)
+
+
+def decode_years(years: str) -> Tuple[int, ...]:
+    return tuple(int(year) for year in years.split('-')) if years else ()
+
+
+class HistoryStore:
+    """
+    Local SQLite database with the assignments of all the previous years.
+    Each year file is only imported again when it changed. It can be
+    queried like an EnrollmentCollection, the statistics are SQL aggregates.
+    """
+
+    def __init__(self, path: str, refresh=False):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # number of unchanged and (re)imported year files
+        self.hits = 0
+        self.misses = 0
+
+        self.connection.executescript(SCHEMA)
+        # the stored departments are renamed
+        fingerprint = f"{STORE_VERSION}:{renames_fingerprint(normalizer.renames)}"
+        if refresh or self.__meta('fingerprint') != fingerprint:
+            self.clear()
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                                        (fingerprint,))
+
+    def __meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def clear(self):
+        """
+        Removes all the imported enrollments, the participant ids are kept.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM enrollments")
+            self.connection.execute("DELETE FROM files")
+
+    def close(self):
+        self.connection.close()
+
+    def import_history(self,
+                       base_path: str,
+                       workers=HISTORY_WORKERS,
+                       timings: Optional[Dict[str, float]] = None) -> 'HistoryStore':
+        """
+        Imports the year files which are new or changed since the last
+        import and removes the files which no longer exist. Each file is
+        replaced in a single transaction, so an import can be safely
+        interrupted and repeated.
+        """
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size
+                 in self.connection.execute("SELECT id, path, mtime_ns, size FROM files")}
+
+        def load(year_file: Tuple[str, str]) -> Tuple[List[Enrollment], float]:
+            start = time.perf_counter()
+            items = read_history_year(*year_file)
+            return items, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            year_files = list_history_years(base_path, executor)
+            positions: Dict[str, int] = {}
+            changed: List[Tuple[str, str]] = []
+            for dir, filepath in year_files:
+                if not os.path.isfile(filepath):
+                    print(f"{dir} overgeslagen")
+                    continue
+                key = os.path.abspath(filepath)
+                positions[key] = len(positions)
+                stat = os.stat(filepath)
+                try:
+                    _, mtime, size = known[key]
+                    if mtime == stat.st_mtime_ns and size == stat.st_size:
+                        self.hits += 1
+                        continue
+                except KeyError:
+                    pass
+                self.misses += 1
+                changed.append((dir, filepath))
+
+            for (dir, filepath), (items, duration) in zip(changed, executor.map(load, changed)):
+                self.__import_file(os.path.abspath(filepath), positions, known, items)
+                if timings is not None:
+                    timings[filepath] = duration
+
+        with self.connection:
+            for path, (file_id, _, _) in known.items():
+                if path not in positions:
+                    self.connection.execute("DELETE FROM enrollments WHERE file_id = ?", (file_id,))
+                    self.connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            self.connection.executemany("UPDATE files SET position = ? WHERE path = ?",
+                                        ((position, path) for path, position in positions.items()))
+
+        return self
+
+    def __import_file(self,
+                      path: str,
+                      positions: Dict[str, int],
+                      known: Dict[str, Tuple[int, int, int]],
+                      items: List[Enrollment]):
+        stat = os.stat(path)
+        with self.connection:
+            if path in known:
+                file_id = known[path][0]
+                self.connection.execute("DELETE FROM enrollments WHERE file_id = ?", (file_id,))
+                self.connection.execute("UPDATE files SET mtime_ns = ?, size = ?, position = ? WHERE id = ?",
+                                        (stat.st_mtime_ns, stat.st_size, positions[path], file_id))
+            else:
+                file_id = self.connection.execute(
+                    "INSERT INTO files (path, mtime_ns, size, position) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_mtime_ns, stat.st_size, positions[path])).lastrowid
+
+            for start in range(0, len(items), INSERT_BATCH_SIZE):
+                self.connection.executemany(
+                    "INSERT INTO enrollments (file_id, seq, email, years, from_dept, assigned_dept) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    ((file_id, seq, item.email, encode_years(item.years), item.from_dept, item.assigned_dept)
+                     for seq, item in enumerate(items[start:start + INSERT_BATCH_SIZE], start)))
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0]
+
+    def __select(self, column: Optional[str] = None, value: Optional[str] = None) -> List[Enrollment]:
+        if column is None:
+            cursor = self.connection.execute(SELECT_ENROLLMENTS.format(where=""))
+        else:
+            cursor = self.connection.execute(SELECT_ENROLLMENTS.format(where=f"WHERE e.{column} = ?"), (value,))
+        return [Enrollment(email, decode_years(years), from_dept, assigned_dept)
+                for email, years, from_dept, assigned_dept in cursor]
+
+    @property
+    def items(self) -> List[Enrollment]:
+        return self.__select()
+
+    def to_rows(self):
+        for enrollment in self.__select():
+            yield enrollment_row(enrollment)
+
+    def list_from_depts(self):
+        return set(dept for dept, in self.connection.execute("SELECT DISTINCT from_dept FROM enrollments"))
+
+    def list_assigned(self):
+        return set(dept for dept, in self.connection.execute("SELECT DISTINCT assigned_dept FROM enrollments"))
+
+    def by_email(self, email):
+        return iter(self.__select('email', email))
+
+    def by_years(self, years: Tuple[int, int]):
+        return iter(self.__select('years', encode_years(years)))
+
+    def by_from_dept(self, dept: str):
+        return iter(self.__select('from_dept', dept))
+
+    def by_assigned_dept(self, dept: str):
+        return iter(self.__select('assigned_dept', dept))
+
+    def count_by(self, attribute: str) -> Dict[Hashable, int]:
+        column = COLUMNS[attribute]
+        counts = self.connection.execute(f"SELECT {column}, COUNT(*) FROM enrollments GROUP BY {column}")
+        if attribute == 'years':
+            return {decode_years(years): count for years, count in counts}
+        return dict(counts.fetchall())
+
+    def count_assigned(self) -> Dict[str, int]:
+        return self.count_by('assigned_dept')
+
+    def to_csv(self, statistics_file: Optional[str] = None, rebuild=False, export: Optional[HistoryExport] = None):
+        """
+        Writes the same anonymised statistics as EnrollmentCollection.to_csv,
+        computed by the database. The participant ids are kept in the
+        database, the first time they are taken from the `statistics_file`
+        (if it exists). Everything is recomputed, so `rebuild` is ignored
+        and the `export` is written completely.
+        """
+        connection = self.connection
+        self.__order_enrollments()
+
+        with connection:
+            if statistics_file is not None and \
+                    not connection.execute("SELECT COUNT(*) FROM participants").fetchone()[0]:
+                statistics = HistoryStatistics.load(statistics_file)
+                if statistics is not None:
+                    connection.executemany("INSERT INTO participants (email, id) VALUES (?, ?)",
+                                           statistics.ids.items())
+
+            # new participants get the next id, in order of their first participation
+            known = connection.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+            connection.execute("""
+                INSERT INTO participants (email, id)
+                SELECT email, ? + ROW_NUMBER() OVER (ORDER BY first)
+                FROM (SELECT email, MIN(ord) AS first FROM temp.ordered
+                      WHERE email NOT IN (SELECT email FROM participants)
+                      GROUP BY email)""", (known,))
+
+        labels = dict(connection.execute("SELECT grp, label FROM temp.groups ORDER BY grp"))
+
+        if export is not None:
+            export.clear()
+        year_rows: List[Dict[str, object]] = []
+        with open('history.csv', 'w', encoding='utf-8-sig') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=HISTORY_COLUMNS, delimiter=';')
+            writer.writeheader()
+            for participant_id, how_many, grp, from_dept, assigned_dept in connection.execute("""
+                    SELECT p.id, ROW_NUMBER() OVER (PARTITION BY o.email ORDER BY o.ord), o.grp,
+                           o.from_dept, o.assigned_dept
+                    FROM temp.ordered o JOIN participants p ON p.email = o.email
+                    ORDER BY o.ord"""):
+                row = history_row(participant_id, how_many, labels[grp], from_dept, assigned_dept)
+                writer.writerow(row)
+                if export is not None:
+                    # the rows are ordered by year
+                    if year_rows and year_rows[0][HISTORY_YEARS] != row[HISTORY_YEARS]:
+                        export.add_year(year_rows[0][HISTORY_YEARS], year_rows)
+                        year_rows = []
+                    year_rows.append(row)
+
+        if year_rows:
+            export.add_year(year_rows[0][HISTORY_YEARS], year_rows)
+
+        # per years the previous years of each participation
+        new_participants: Dict[str, Dict[Optional[str], int]] = {label: {} for label in labels.values()}
+        for grp, previous, count in connection.execute("""
+                WITH participations AS (
+                    SELECT email, grp, LAG(grp) OVER (PARTITION BY email ORDER BY grp) AS previous
+                    FROM (SELECT DISTINCT email, grp FROM temp.ordered))
+                SELECT o.grp, p.previous, COUNT(*)
+                FROM temp.ordered o JOIN participations p ON p.email = o.email AND p.grp = o.grp
+                GROUP BY o.grp, p.previous"""):
+            new_participants[labels[grp]][None if previous is None else labels[previous]] = count
+        write_new_participants(new_participants)
+
+        # ordered by the first participant with that number of participations
+        write_histogram(connection.execute("""
+            SELECT times, COUNT(*)
+            FROM (SELECT COUNT(*) AS times, MIN(ord) AS first FROM temp.ordered GROUP BY email)
+            GROUP BY times
+            ORDER BY MIN(first)""").fetchall())
+
+        write_depts({labels[grp]: (assigned_depts, from_depts) for grp, assigned_depts, from_depts in connection.execute("""
+            SELECT grp, COUNT(DISTINCT assigned_dept), COUNT(DISTINCT from_dept)
+            FROM temp.ordered
+            GROUP BY grp
+            ORDER BY grp""")})
+
+    def __order_enrollments(self):
+        """
+        Numbers the years (ordered by the start year, within that in order
+        of appearance) and the enrollments in the order of the statistics.
+        """
+        connection = self.connection
+        years = connection.execute("""
+            SELECT e.years, MIN(f.position)
+            FROM enrollments e JOIN files f ON f.id = e.file_id
+            GROUP BY e.years""").fetchall()
+        years.sort(key=lambda item: (decode_years(item[0])[0], item[1]))
+
+        with connection:
+            connection.execute("DROP TABLE IF EXISTS temp.groups")
+            connection.execute("CREATE TEMP TABLE groups (years TEXT PRIMARY KEY, grp INTEGER, label TEXT)")
+            connection.executemany("INSERT INTO temp.groups (years, grp, label) VALUES (?, ?, ?)",
+                                   ((encoded, grp, f'{decode_years(encoded)[0]}-{decode_years(encoded)[1]}')
+                                    for grp, (encoded, _) in enumerate(years)))
+
+            connection.execute("DROP TABLE IF EXISTS temp.ordered")
+            connection.execute("""
+                CREATE TEMP TABLE ordered AS
+                SELECT ROW_NUMBER() OVER (ORDER BY g.grp, f.position, e.seq) AS ord,
+                       e.email, g.grp, e.from_dept, e.assigned_dept
+                FROM enrollments e
+                    JOIN files f ON f.id = e.file_id
+                    JOIN temp.groups g ON g.years = e.years""")
+            connection.execute("CREATE INDEX temp.ordered_email ON ordered(email, ord)")
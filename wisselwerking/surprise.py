@@ -0,0 +1,66 @@
+import csv
+from typing import TYPE_CHECKING, Callable, Dict, Mapping, Optional
+
+from .history import EnrollmentCollection, rename_dept
+from .settings import ASSIGNED_CHOICE, ENROLLMENT_DEPT, ENROLLMENT_MAIL
+
+if TYPE_CHECKING:
+    from .assign import AssignmentResult
+
+
+def read_placements(path: str) -> Dict[str, str]:
+    """
+    Reads the choices for the participants who want to be surprised: a
+    semicolon separated file with (at least) an e-mail and assigned column.
+    """
+    placements: Dict[str, str] = {}
+    with open(path, mode="r", encoding="utf-8-sig") as csv_file:
+        csv_reader = csv.DictReader(csv_file, delimiter=';')
+
+        for row in csv_reader:
+            placements[row[ENROLLMENT_MAIL].lower().strip()] = row[ASSIGNED_CHOICE].strip()
+
+    return placements
+
+
+def surprise_choice(enrollment: Mapping[str, str],
+                    history: EnrollmentCollection,
+                    free_places: Dict[str, int]) -> Optional[str]:
+    """
+    Picks a choice for someone who wants to be surprised: the choice with
+    the most free places, which isn't their own department and which they
+    didn't do before.
+    """
+    previous = list(history.by_email(enrollment[ENROLLMENT_MAIL].lower().strip()))
+    excluded = set([rename_dept(enrollment[ENROLLMENT_DEPT])] +
+                   [item.from_dept for item in previous] +
+                   [item.assigned_dept for item in previous])
+
+    best = None
+    for choice in sorted(free_places):
+        if free_places[choice] <= 0 or rename_dept(choice) in excluded:
+            continue
+        if best is None or free_places[choice] > free_places[best]:
+            best = choice
+
+    return best
+
+
+def auto_policy(history: EnrollmentCollection) -> Callable[[Mapping[str, str], 'AssignmentResult'], Optional[str]]:
+    return lambda enrollment, result: surprise_choice(enrollment, history, result.free_places())
+
+
+def placement_policy(placements: Dict[str, str],
+                     fallback: Callable[[Mapping[str, str], 'AssignmentResult'], Optional[str]]) \
+        -> Callable[[Mapping[str, str], 'AssignmentResult'], Optional[str]]:
+    """
+    Uses the placement of the participant (if there is still room),
+    otherwise the fallback policy.
+    """
+    def policy(enrollment: Mapping[str, str], result: 'AssignmentResult') -> Optional[str]:
+        choice = placements.get(enrollment[ENROLLMENT_MAIL].lower().strip())
+        if choice is not None and result.has_room(choice):
+            return choice
+        return fallback(enrollment, result)
+
+    return policy
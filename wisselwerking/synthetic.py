@@ -0,0 +1,132 @@
+import csv
+import os
+import random
+from typing import Dict, List, Optional
+
+from .settings import \
+    ASSIGNED_CHOICE, \
+    ENROLLMENT_CHOICES, \
+    ENROLLMENT_DEPT, \
+    ENROLLMENT_FIRSTNAME, \
+    ENROLLMENT_LASTNAME, \
+    ENROLLMENT_MAIL, \
+    ENROLLMENT_SOURCE, \
+    NONE_CHOICE, \
+    RANDOM_CHOICE
+
+FIRST_NAMES = ["jan", "Anna", "els", "piet klaas", "Mohamed", "sanne", "Daan", "fleur", "Noor", "lucas"]
+LAST_NAMES = ["van der Berg", "Jansen", "de vries", "Bakker", "van Dijk", "el Amrani", "Visser", "de Jong"]
+DEPARTMENTS = ["Onderwijsbeleid", "HR", "Studiepunt", "Finance  & Control", "ICT", "Bibliotheek",
+               "Onderzoeksbeleid", "Communicatie", "Facilitair", "Studentzaken"]
+
+
+def synthetic_choices(count: int) -> List[str]:
+    return [f"Wisselwerking {i + 1:03d}" for i in range(count)]
+
+
+def synthetic_capacities(choices: List[str], enrollments: int, rng: random.Random) -> Dict[str, int]:
+    """
+    Capacities for about three quarters of the enrollments, a few choices
+    are closed.
+    """
+    average = max(1, enrollments * 3 // (4 * len(choices)))
+    return {choice: 0 if rng.random() < 0.05 else rng.randint(1, 2 * average) for choice in choices}
+
+
+def popularity(choices: List[str], skew: float) -> List[float]:
+    # Zipf-like: a few choices are wanted by many
+    return [1 / (rank + 1) ** skew for rank in range(len(choices))]
+
+
+def synthetic_email(participant: int) -> str:
+    return f"deelnemer{participant}@uu.nl"
+
+
+def write_form_export(path: str,
+                      count: int,
+                      choices: List[str],
+                      rng: random.Random,
+                      skew=1.1,
+                      random_rate=0.05,
+                      empty_rate=0.1,
+                      test_rate=0.01,
+                      duplicate_rate=0.01,
+                      participants: Optional[int] = None):
+    """
+    Writes a form export like the one downloaded from the enrollment form,
+    with `count` rows. Part of the rows want to be surprised, didn't fill
+    in a second or third choice, are tests or enrolled twice.
+    """
+    weights = popularity(choices, skew)
+    if participants is None:
+        participants = count * 2
+    fieldnames = [ENROLLMENT_SOURCE, ENROLLMENT_FIRSTNAME, ENROLLMENT_LASTNAME, ENROLLMENT_MAIL,
+                  ENROLLMENT_DEPT] + ENROLLMENT_CHOICES + ["opmerking"]
+
+    with open(path, mode="w", encoding="iso8859-15", newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerow(fieldnames)
+        previous: List[str] = []
+        for _ in range(count):
+            if previous and rng.random() < duplicate_rate:
+                email = rng.choice(previous)
+            else:
+                email = synthetic_email(rng.randrange(participants))
+                previous.append(email)
+
+            chosen = []
+            for rank in range(len(ENROLLMENT_CHOICES)):
+                value = rng.random()
+                if value < random_rate:
+                    chosen.append(RANDOM_CHOICE)
+                elif rank > 0 and value < random_rate + empty_rate:
+                    chosen.append(rng.choice(NONE_CHOICE))
+                else:
+                    chosen.append(rng.choices(choices, weights)[0])
+
+            writer.writerow([
+                "Test" if rng.random() < test_rate else "Web",
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                email,
+                rng.choice(DEPARTMENTS)
+            ] + chosen + [""])
+
+
+def write_history_tree(base_path: str,
+                       years: int,
+                       per_year: int,
+                       choices: List[str],
+                       rng: random.Random,
+                       first_year=2000,
+                       recent=3,
+                       archive_size=4,
+                       skew=1.1,
+                       participants: Optional[int] = None):
+    """
+    Writes the assignments of previous years in the same layout as the
+    share: the `recent` most recent years at the top and older years in
+    nested archief directories of `archive_size` years each.
+    """
+    weights = popularity(choices, skew)
+    if participants is None:
+        participants = per_year * 2
+
+    directory = base_path
+    for index in range(years):
+        # the most recent year first
+        year = first_year + years - 1 - index
+        if index >= recent and (index - recent) % archive_size == 0:
+            directory = os.path.join(directory, "Archief" if directory == base_path else "archief oud")
+        year_path = os.path.join(directory, f"Wisselwerking {year}-{year + 1}")
+        os.makedirs(year_path, exist_ok=True)
+
+        with open(os.path.join(year_path, "toewijzingen.csv"), mode="w", encoding="utf-8-sig", newline="") as csv_file:
+            writer = csv.writer(csv_file, delimiter=';')
+            writer.writerow([ASSIGNED_CHOICE, ENROLLMENT_MAIL, ENROLLMENT_DEPT])
+            for _ in range(per_year):
+                writer.writerow([
+                    rng.choices(choices, weights)[0],
+                    synthetic_email(rng.randrange(participants)).upper(),
+                    rng.choice(DEPARTMENTS)
+                ])
@@ -0,0 +1,211 @@
+import csv
+import hashlib
+import io
+import os
+from typing import Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+from .assign import SOLVERS, AssignmentResult, SurprisePolicy, chosen, complete, open_choices, prepare
+from .enrollments import FormEnrollment, without_tests
+from .settings import ENROLLMENT_MAIL
+
+
+class ExportState:
+    __slots__ = ['mtime_ns', 'size', 'offset', 'digest', 'columns']
+
+    def __init__(self, mtime_ns: int, size: int, offset: int, digest: bytes, columns: Dict[str, int]):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        # the (complete) lines up to here have been read
+        self.offset = offset
+        self.digest = digest
+        self.columns = columns
+
+
+class ExportWatcher:
+    """
+    Follows a form export, or a directory in which exports are stored, and
+    returns the rows of the files which changed since the last poll. When
+    rows were only appended to a file, only those rows are parsed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, ExportState] = {}
+        # columns of the first export
+        self.fieldnames: Optional[List[str]] = None
+
+    def export_files(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return [self.path]
+        files = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.lower().endswith('.csv')]
+        # oldest export first
+        return sorted(files, key=lambda path: (os.path.getmtime(path), path))
+
+    def poll(self) -> List[FormEnrollment]:
+        rows: List[FormEnrollment] = []
+        for path in self.export_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state = self.files.get(path)
+            if state is not None and state.mtime_ns == stat.st_mtime_ns and state.size == stat.st_size:
+                continue
+            rows += self.__read(path, stat, state)
+        return rows
+
+    def __read(self, path: str, stat: os.stat_result, state: Optional[ExportState]) -> List[FormEnrollment]:
+        with open(path, mode="rb") as export_file:
+            data = export_file.read()
+        # a line which is still being written is read on a next poll
+        data = data[:data.rfind(b'\n') + 1]
+
+        if state is not None and len(data) >= state.offset and \
+                hashlib.sha256(data[:state.offset]).digest() == state.digest:
+            # rows were appended, these are in order of enrollment
+            columns = state.columns
+            values = list(csv.reader(io.StringIO(data[state.offset:].decode('iso8859-15')), delimiter=';'))
+        else:
+            csv_reader = csv.reader(io.StringIO(data.decode('iso8859-15')), delimiter=';')
+            fieldnames = next(csv_reader, None)
+            if fieldnames is None:
+                # still empty
+                return []
+            if self.fieldnames is None:
+                self.fieldnames = fieldnames
+            columns = {fieldname: index for index, fieldname in enumerate(fieldnames)}
+            values = list(csv_reader)
+            # the top row is the last entry
+            values.reverse()
+
+        self.files[path] = ExportState(stat.st_mtime_ns, stat.st_size, len(data), hashlib.sha256(data).digest(), columns)
+        # skip empty lines
+        return list(without_tests(FormEnrollment(columns, row) for row in values if row))
+
+
+class IncrementalAssigner:
+    """
+    Keeps the enrollments (deduplicated by email) and the assignment of
+    each group of choices which share enrollments. These groups don't
+    influence each other, so after new enrollments arrive only the groups
+    containing their choices are assigned again.
+    """
+
+    def __init__(self, solver='greedy'):
+        self.solver = solver
+        # email -> enrollment, the first enrollment first
+        self.enrollments: Dict[str, FormEnrollment] = {}
+        # email -> the choices of the enrollment
+        self.choices: Dict[str, List[str]] = {}
+        # rows which were already read (again when an export is downloaded again)
+        self.rows: Set[Tuple[str, ...]] = set()
+        # choices of a group -> the capacities, assignments and counter
+        self.solved: Dict[FrozenSet[str], Tuple[Tuple[Optional[int], ...],
+                                                List[Tuple[Mapping[str, str], str]],
+                                                Dict[str, int]]] = {}
+        # choices of the enrollments which were added since the last update
+        self.changed: Set[str] = set()
+
+    def add(self, rows: List[FormEnrollment]) -> List[FormEnrollment]:
+        """
+        Adds the new rows (in order of enrollment), returns those which were
+        added. Like reading the whole export, the last enrollment of a
+        participant replaces the previous one.
+        """
+        added = []
+        for row in rows:
+            if row.values in self.rows:
+                continue
+            self.rows.add(row.values)
+            mail = row[ENROLLMENT_MAIL].lower().strip()
+            if mail in self.enrollments:
+                print("DUBBELE DEELNEMER: " + mail)
+                self.changed.update(self.choices.pop(mail))
+                del self.enrollments[mail]
+            self.enrollments[mail] = row
+            self.choices[mail] = chosen(row)
+            self.changed.update(self.choices[mail])
+            added.append(row)
+        return added
+
+    def groups(self) -> List[Tuple[FrozenSet[str], List[FormEnrollment]]]:
+        """
+        The groups of choices which share enrollments, with the enrollments
+        of each group.
+        """
+        parent: Dict[str, str] = {}
+
+        def find(choice: str) -> str:
+            while parent[choice] != choice:
+                parent[choice] = parent[parent[choice]]
+                choice = parent[choice]
+            return choice
+
+        for choices in self.choices.values():
+            for choice in choices:
+                parent.setdefault(choice, choice)
+            for choice in choices[1:]:
+                parent[find(choice)] = find(choices[0])
+
+        groups: Dict[str, Tuple[Set[str], List[FormEnrollment]]] = {}
+        for choice in parent:
+            groups.setdefault(find(choice), (set(), []))[0].add(choice)
+        for mail, choices in self.choices.items():
+            if choices:
+                groups[find(choices[0])][1].append(self.enrollments[mail])
+
+        return [(frozenset(choices), members) for choices, members in groups.values()]
+
+    def update(self,
+               capacities: Dict[str, Optional[int]],
+               surprise: SurprisePolicy) -> Tuple[AssignmentResult, Set[str]]:
+        """
+        Assigns all the enrollments, only the groups of choices with new
+        enrollments or other capacities are assigned again. Returns the
+        result and the choices which were assigned again.
+        """
+        enrollments = list(self.enrollments.values())
+        result = prepare(enrollments, capacities)
+        choices = open_choices(result)
+        choice_order = {choice: index for index, choice in enumerate(choices)}
+        position = {enrollment: index for index, enrollment in enumerate(enrollments)}
+
+        solved = {}
+        recomputed: Set[str] = set()
+        # (order, assignment) of all the groups
+        merged: List[Tuple[Tuple[int, int], Tuple[Mapping[str, str], str]]] = []
+        for group, members in self.groups():
+            group_capacities = tuple(result.get_capacity(choice) for choice in sorted(group))
+            try:
+                solved_capacities, assignments, counter = self.solved[group]
+                if solved_capacities != group_capacities or group & self.changed:
+                    raise KeyError
+            except KeyError:
+                counter = dict.fromkeys(group, 0)
+                assignments = SOLVERS[self.solver](members,
+                                                   [choice for choice in choices if choice in group],
+                                                   result.get_capacity,
+                                                   counter)
+                recomputed |= group
+            solved[group] = (group_capacities, assignments, counter)
+
+            for choice, count in counter.items():
+                result.counter[choice] += count
+            rounds: Dict[str, int] = {}
+            for enrollment, choice in assignments:
+                if self.solver == 'greedy':
+                    # each iteration every choice is assigned once: the
+                    # order in which a single run would have assigned
+                    rounds[choice] = rounds.get(choice, 0) + 1
+                    order = (rounds[choice], choice_order[choice])
+                else:
+                    order = (position[enrollment], 0)
+                merged.append((order, (enrollment, choice)))
+
+        merged.sort(key=lambda item: item[0])
+        result.assignments = [assignment for _, assignment in merged]
+        self.solved = solved
+        self.changed = set()
+
+        complete(result, enrollments, surprise)
+        return result, recomputed